@@ -0,0 +1,238 @@
+# analytics.py
+# =====================================================
+# 📊 開題 / 公布答案事件紀錄（背景批次寫入 SQLite）
+# =====================================================
+# 開啟題目、公布答案時只把一筆事件 tuple 放進記憶體佇列（不做任何 I/O、不等鎖），
+# 由背景執行緒每隔 FLUSH_INTERVAL 秒把累積的事件一次寫進 SQLite。
+# 佇列滿了（資料庫卡住）就丟棄新事件並計數，分析功能永遠不會拖慢 rerun。
+# 每筆事件都記下題庫內容版本（quiz_bank.bank_digest 的前 12 碼）：題庫熱更新後題目可能增刪或換位置，
+# 統計一律依版本分開，舊版本的事件不會算到新版本同一個題號上。
+# 統計（各題 / 各分組的開題數、公布率、從開題到公布答案的時間）在管理頁或命令列以 pandas 計算：
+#   python3 analytics.py [--bank 題庫名稱] [--db analytics.db]
+import argparse
+import os
+import queue
+import sqlite3
+import time
+
+from write_behind import WriteBehind
+
+ENABLED = os.environ.get("QUIZ_ANALYTICS", "1") != "0"
+DB_PATH = os.environ.get("QUIZ_ANALYTICS_DB", "analytics.db")
+FLUSH_INTERVAL = float(os.environ.get("QUIZ_ANALYTICS_FLUSH_SECONDS", "2"))
+MAX_QUEUED = int(os.environ.get("QUIZ_ANALYTICS_MAX_QUEUED", "50000"))
+
+EVENT_OPEN = "open"
+EVENT_REVEAL = "reveal"
+
+# 事件：(時間, 種類, 題庫, 版本, 題目索引, 分組, session, 帳號)
+_QUEUE = queue.Queue(maxsize=MAX_QUEUED)
+# 統計數據：已寫入、因佇列已滿而丟棄的事件數，以及寫入批次數
+_STATS = {"written": 0, "dropped": 0, "batches": 0}
+
+
+# =====================================================
+# 🗄️ SQLite（write_behind 背景批次寫入）
+# =====================================================
+def _setup(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            ts REAL NOT NULL,
+            kind TEXT NOT NULL,
+            bank TEXT NOT NULL,
+            version TEXT,
+            q_idx INTEGER NOT NULL,
+            q_group TEXT NOT NULL,
+            session TEXT,
+            user TEXT
+        )
+        """
+    )
+    _migrate(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS events_bank ON events (bank, q_idx)")
+
+
+def _migrate(conn):
+    # 舊版資料庫沒有 version 欄位：補上欄位，舊事件的版本為 NULL（視為未知版本）
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+    if "version" not in columns:
+        conn.execute("ALTER TABLE events ADD COLUMN version TEXT")
+
+
+def _drain():
+    rows = []
+    while True:
+        try:
+            rows.append(_QUEUE.get_nowait())
+        except queue.Empty:
+            return rows
+
+
+def _write(conn, rows):
+    conn.executemany(
+        "INSERT INTO events (ts, kind, bank, version, q_idx, q_group, session, user) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    _STATS["written"] += len(rows)
+    _STATS["batches"] += 1
+    return len(rows)
+
+
+def _requeue(rows):
+    # 事件帶有自己的時間，放回佇列的順序不影響統計；佇列已滿時同樣丟棄並計數
+    for row in rows:
+        try:
+            _QUEUE.put_nowait(row)
+        except queue.Full:
+            _STATS["dropped"] += 1
+
+
+_writer = WriteBehind("analytics", DB_PATH, FLUSH_INTERVAL, _setup, _drain, _write, _requeue)
+# 把佇列中的事件一次寫進 SQLite；回傳寫入筆數
+flush = _writer.flush
+
+
+# =====================================================
+# 📤 記錄事件（rerun 路徑上呼叫）
+# =====================================================
+def record(kind, bank, version, q_idx, q_group, session=None, user=None):
+    if not ENABLED:
+        return
+    try:
+        _QUEUE.put_nowait((time.time(), kind, bank, version, q_idx, q_group, session, user))
+    except queue.Full:
+        _STATS["dropped"] += 1
+        return
+    _writer.start()
+
+
+def record_open(bank, version, q_idx, q_group, session=None, user=None):
+    record(EVENT_OPEN, bank, version, q_idx, q_group, session, user)
+
+
+def record_reveal(bank, version, q_idx, q_group, session=None, user=None):
+    record(EVENT_REVEAL, bank, version, q_idx, q_group, session, user)
+
+
+def stats():
+    result = dict(_STATS)
+    result["queued"] = _QUEUE.qsize()
+    return result
+
+
+# =====================================================
+# 📈 統計（pandas；只在管理頁 / 命令列使用，第一次用到才載入）
+# =====================================================
+def load_events(bank=None, db_path=None):
+    """ 讀取事件為 DataFrame；db_path 為 None 時先寫入佇列中的事件再讀目前的資料庫 """
+    import pandas as pd
+
+    if db_path is None:
+        flush()
+        with _writer.lock:
+            return _read_events(pd, _writer.connect(), bank)
+    conn = sqlite3.connect(db_path)
+    try:
+        return _read_events(pd, conn, bank)
+    finally:
+        conn.close()
+
+
+def _read_events(pd, conn, bank):
+    # 只讀取：舊版資料庫沒有 version 欄位時不改動資料庫，直接當成 NULL
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+    version = "version" if "version" in columns else "NULL AS version"
+    sql = f"SELECT ts, kind, bank, {version}, q_idx, q_group, session, user FROM events"
+    params = ()
+    if bank is not None:
+        sql += " WHERE bank = ?"
+        params = (bank,)
+    events = pd.read_sql_query(sql, conn, params=params)
+    # 加入版本欄位之前記錄的事件沒有版本，統一以空字串表示
+    return events.assign(version=events["version"].fillna(""))
+
+
+def summarize(events):
+    """ 回傳 (各題統計, 各分組統計) 兩個 DataFrame，依題庫與版本分開統計
+
+    開題數 / 開題隊數、公布數 / 公布隊數，
+    公布率：開過的（session, 題目）中有公布答案的比例；只算找得到對應開題的公布
+    （開題記在熱更新前的版本、或因佇列已滿被丟棄時，那次公布不列入），所以不會超過 100%，
+    思考秒數：同一 session 公布答案時，距離該題最近一次開題的秒數（中位數與平均）
+    """
+    import pandas as pd
+
+    # 沒有事件時 read_sql_query 的欄位是 object，先轉成正確型別
+    events = events.astype({"ts": float, "q_idx": int}).assign(session=events["session"].fillna(""))
+    opens = events[events["kind"] == EVENT_OPEN]
+    reveals = events[events["kind"] == EVENT_REVEAL]
+
+    # 每次公布答案對應同一 session、同一題在它之前最近的一次開題
+    timed = pd.merge_asof(
+        reveals.sort_values("ts"),
+        opens[["ts", "bank", "version", "q_idx", "session"]].rename(columns={"ts": "open_ts"}).sort_values("open_ts"),
+        left_on="ts",
+        right_on="open_ts",
+        by=["bank", "version", "q_idx", "session"],
+        direction="backward",
+    )
+    timed["think_seconds"] = timed["ts"] - timed["open_ts"]
+    pair = ["bank", "version", "q_idx", "q_group", "session"]
+    opened = opens.drop_duplicates(pair)
+    revealed = timed[timed["open_ts"].notna()].drop_duplicates(pair)
+
+    def table(keys):
+        result = pd.concat(
+            [
+                opens.groupby(keys).size().rename("opens"),
+                opens.groupby(keys)["session"].nunique().rename("open_sessions"),
+                reveals.groupby(keys).size().rename("reveals"),
+                reveals.groupby(keys)["session"].nunique().rename("reveal_sessions"),
+                timed.groupby(keys)["think_seconds"].median().rename("think_median"),
+                timed.groupby(keys)["think_seconds"].mean().rename("think_mean"),
+                opened.groupby(keys).size().rename("opened_pairs"),
+                revealed.groupby(keys).size().rename("revealed_pairs"),
+            ],
+            axis=1,
+        )
+        counts = ["opens", "open_sessions", "reveals", "reveal_sessions", "opened_pairs", "revealed_pairs"]
+        result[counts] = result[counts].fillna(0).astype(int)
+        result["reveal_rate"] = (result["revealed_pairs"] / result["opened_pairs"]).where(
+            result["opened_pairs"] > 0
+        )
+        return result.drop(columns=["opened_pairs", "revealed_pairs"]).reset_index()
+
+    per_question = table(["bank", "version", "q_idx", "q_group"]).sort_values(["bank", "version", "q_idx"])
+    per_group = table(["bank", "version", "q_group"]).sort_values(
+        ["bank", "version", "opens"], ascending=[True, True, False]
+    )
+    return per_question.reset_index(drop=True), per_group.reset_index(drop=True)
+
+
+
+# =====================================================
+# 🚀 命令列
+# =====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="各題 / 各分組的開題與公布答案統計")
+    parser.add_argument("--db", default=DB_PATH, help="事件資料庫（預設為環境變數 QUIZ_ANALYTICS_DB 或 analytics.db）")
+    parser.add_argument("--bank", help="只統計這個題庫")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        raise SystemExit(f"❌ 找不到事件資料庫：{args.db}")
+
+    events = load_events(args.bank, db_path=args.db)
+    if events.empty:
+        print("（尚無事件）")
+        return
+    per_question, per_group = summarize(events)
+    print(f"📊 共 {len(events)} 筆事件\n")
+    formatters = {"reveal_rate": lambda v: "-" if v != v else f"{v:.0%}"}
+    for title, table in (("📘 各題", per_question), ("🟩 各分組", per_group)):
+        print(f"{title}\n" + table.to_string(index=False, formatters=formatters, float_format=lambda v: f"{v:.1f}") + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
 import os
-import json
+import uuid
 import streamlit as st
-import streamlit.components.v1 as components
 from dotenv import load_dotenv
-from cryptography.fernet import Fernet
+
+import analytics
+import bank_watcher
+import live_session
+import metrics
+import progress_store
+import quiz_bank
+import startup
+import styles
+from quiz_grid import quiz_grid
 
 # =====================================================
 # 🧩 初始化設定
@@ -14,42 +22,9 @@ load_dotenv()
 # =====================================================
 # 💅 全局樣式
 # =====================================================
-st.markdown("""
-<style>
-html, body, [class*="css"] {
-    font-size: 1.1rem !important;
-    line-height: 1.5em !important;
-    overflow-x: hidden;
-}
-h1, h2, h3, h4, h5 {
-    font-weight: 800 !important;
-    color: #222 !important;
-    line-height: 1.3em !important;
-}
-p, span, div {
-    font-size: 1rem !important;
-}
-button, [data-testid="stButton"] button {
-    font-size: 1.05rem !important;
-    padding: 0.3em 0.8em !important;
-    border-radius: 8px !important;
-}
-.stAlert {
-    font-size: 1rem !important;
-}
-.block-container {
-    padding-top: 0.8em !important;
-    padding-bottom: 0.8em !important;
-    max-width: 100% !important;
-}
-section.main > div {
-    max-width: 95% !important;
-}
-[data-testid="stHorizontalBlock"] {
-    align-items: flex-start !important;
-}
-</style>
-""", unsafe_allow_html=True)
+# static/app.css：由 serve.py 提供時只送一行 @import，否則內嵌（見 styles.py）
+with metrics.phase("css_global"):
+    st.markdown(styles.global_style(), unsafe_allow_html=True)
 
 # =====================================================
 # 🔐 登入帳密與金鑰設定
@@ -65,53 +40,33 @@ if st.query_params.get("ping") == "1":
     st.write("pong 💓")
     st.stop()
 
-# =====================================================
-# 📘 題庫載入（支援加密）
-# =====================================================
-QUESTIONS = None
-if QUIZ_SECRET_KEY and os.path.exists("questions.enc"):
-    try:
-        fernet = Fernet(QUIZ_SECRET_KEY.encode())
-        with open("questions.enc", "rb") as f:
-            encrypted_data = f.read()
-        decrypted = fernet.decrypt(encrypted_data)
-        QUESTIONS = json.loads(decrypted.decode())
-    except Exception as e:
-        st.error(f"❌ 題庫解密失敗：{e}")
-        st.stop()
-else:
-    try:
-        # 嘗試讀取 questions.json
-        if os.path.exists("questions.json"):
-            with open("questions.json", "r", encoding="utf-8") as f:
-                QUESTIONS = json.load(f)
-        else:
-            st.error("❌ 找不到 questions.json 或 questions.enc")
-            st.stop()
-            
-        if not QUIZ_SECRET_KEY:
-             st.warning("⚠️ 未偵測到加密金鑰，目前使用明文 questions.json。")
-             
-    except Exception as e:
-        st.error(f"❌ 題庫載入失敗：{e}")
-        st.stop()
-
 # =====================================================
 # 🧠 Session 狀態初始化
 # =====================================================
 defaults = {
     "page": "login",
     "authenticated": False,
+    "bank": None,
     "current_q": None,
     "show_answer": False,
     "show_answer_dialog": False,
-    "answered_questions": [],
+    # 作答紀錄：題目索引的 set；progress_id 為「帳號:裝置 sid」，用來存取伺服器端紀錄
+    "answered_questions": set(),
+    "progress_id": None,
+    "username": None,
+    # session 識別碼：效能指標（QUIZ_METRICS=1）與作答分析用來區分不同的裝置
+    "session_id": None,
     "confirm_clear": False,
+    # 投影模式：主持人的房間代碼；觀眾目前畫面對應的 version
+    "live_room": None,
+    "live_version": None,
     # ✅ 新增：文字縮放倍率，預設 1.25 倍
     "text_scale": 1.25, 
 }
 for k, v in defaults.items():
     st.session_state.setdefault(k, v)
+if st.session_state["session_id"] is None:
+    st.session_state["session_id"] = uuid.uuid4().hex[:12]
 
 # =====================================================
 # ⚙️ 共用函式
@@ -120,11 +75,149 @@ def goto(page_name: str):
     st.session_state["page"] = page_name
     st.rerun()
 
+# 管理頁 → 功能是否啟用；首頁按鈕與頁面本身都經由 can_open 檢查，不各自判斷
+ADMIN_PAGES = {"metrics": metrics.ENABLED, "analytics": analytics.ENABLED}
+
+def can_open(page_name: str):
+    return ADMIN_PAGES[page_name] and metrics.is_admin(st.session_state["username"])
+
+def set_state(**values):
+    """ 給按鈕 on_click 用：一次更新多個 session 狀態 """
+    for k, v in values.items():
+        st.session_state[k] = v
+
+def load_saved_progress():
+    """ 讀取目前帳號 / 裝置在目前題庫的作答紀錄（伺服器端） """
+    if st.session_state["progress_id"] is None or st.session_state["bank"] is None:
+        return set()
+    return progress_store.load_progress(st.session_state["progress_id"], st.session_state["bank"])
+
+def save_progress():
+    """ 作答紀錄交給 progress_store 批次寫入，不會在 rerun 中等待磁碟 """
+    if st.session_state["progress_id"] is not None:
+        progress_store.save_progress(
+            st.session_state["progress_id"],
+            st.session_state["bank"],
+            st.session_state["answered_questions"],
+        )
+
+def reset_progress():
+    """ 切換題庫時重設題目狀態，並載入該題庫已儲存的作答紀錄 """
+    st.session_state["current_q"] = None
+    st.session_state["show_answer"] = False
+    st.session_state["show_answer_dialog"] = False
+    st.session_state["answered_questions"] = load_saved_progress()
+
+def select_bank():
+    """ 首頁題庫選單的 callback：切換題庫並清空本題庫的作答狀態 """
+    name = st.session_state["bank_selector"]
+    if name != st.session_state["bank"]:
+        st.session_state["bank"] = name
+        st.query_params["bank"] = name
+        reset_progress()
+
+def record_event(record, q_idx):
+    """ 開題 / 公布答案事件只放進記憶體佇列，由 analytics 在背景批次寫入 """
+    record(
+        st.session_state["bank"], BANK_VERSION, q_idx, QUESTIONS[q_idx].group,
+        st.session_state["session_id"], st.session_state["username"],
+    )
+
 def goto_question(idx: int):
     st.session_state["current_q"] = idx
     st.session_state["show_answer"] = False
+    record_event(analytics.record_open, idx)
     goto("question")
 
+def reveal_answer(q_idx):
+    set_state(show_answer=True, show_answer_dialog=False)
+    record_event(analytics.record_reveal, q_idx)
+
+def start_live():
+    st.session_state["live_room"] = live_session.open_room(
+        st.session_state["progress_id"], st.session_state["bank"]
+    )
+
+def stop_live():
+    live_session.close_room(st.session_state["live_room"], st.session_state["progress_id"])
+    st.session_state["live_room"] = None
+
+def sync_live():
+    """ 主持人模式：把目前題目與是否公布答案同步給觀眾（狀態沒變就不會通知觀眾） """
+    code = st.session_state["live_room"]
+    if code is None:
+        return
+    current_q = st.session_state["current_q"] if st.session_state["page"] == "question" else None
+    version = live_session.publish(
+        code,
+        st.session_state["progress_id"],
+        st.session_state["bank"],
+        current_q,
+        current_q is not None and st.session_state["show_answer"],
+    )
+    if version is None:
+        # 房間已逾時被移除
+        st.session_state["live_room"] = None
+
+# =====================================================
+# 📡 觀眾加入投影（?live=房間代碼）
+# =====================================================
+LIVE_CODE = live_session.normalize_code(st.query_params.get("live"))
+LIVE_ROOM = live_session.get_room(LIVE_CODE) if LIVE_CODE else None
+if LIVE_CODE:
+    st.session_state["page"] = "live"
+elif st.session_state["page"] == "live":
+    st.session_state["page"] = "login"
+
+# =====================================================
+# 📘 題庫載入（支援加密、多題庫）
+# =====================================================
+# 題庫清單只掃描檔名；解密結果由 quiz_bank 在整個程序中以 LRU 快取，
+# 只有第一次被選到的題庫才會解密；題庫檔案更新時由 bank_watcher 在背景重新載入
+bank_watcher.start(key=QUIZ_SECRET_KEY)
+with metrics.phase("bank_discover"):
+    BANKS = quiz_bank.discover_banks(key=QUIZ_SECRET_KEY)
+if not BANKS:
+    st.error("❌ 找不到 questions.json 或 questions.enc")
+    st.stop()
+
+# 可用 ?bank=題庫名稱 指定題庫（例如活動專屬連結）；觀眾跟著主持人的題庫
+requested_bank = LIVE_ROOM["bank"] if LIVE_ROOM else st.query_params.get("bank")
+if requested_bank in BANKS and requested_bank != st.session_state["bank"]:
+    st.session_state["bank"] = requested_bank
+    reset_progress()
+if st.session_state["bank"] not in BANKS:
+    st.session_state["bank"] = quiz_bank.default_bank_name(BANKS)
+    reset_progress()
+
+bank_path = BANKS[st.session_state["bank"]]
+QUESTIONS = None
+try:
+    with metrics.phase("bank_load"):
+        QUESTIONS = quiz_bank.load_bank(bank_path, QUIZ_SECRET_KEY)
+except Exception as e:
+    if bank_path.endswith(".enc"):
+        st.error(f"❌ 題庫解密失敗：{e}")
+    else:
+        st.error(f"❌ 題庫載入失敗：{e}")
+    st.stop()
+# 題庫內容版本：作答分析依版本分開統計（熱更新後題號可能對應到不同題目）
+BANK_VERSION = (quiz_bank.bank_digest(QUESTIONS) or "")[:12]
+
+# 題庫熱更新後題數可能變少：目前題目已不存在就回首頁，作答紀錄也只保留仍存在的題目
+if st.session_state["current_q"] is not None and st.session_state["current_q"] >= len(QUESTIONS):
+    st.session_state["current_q"] = None
+    st.session_state["show_answer"] = False
+    st.session_state["show_answer_dialog"] = False
+    if st.session_state["page"] == "question":
+        st.session_state["page"] = "home"
+answered = st.session_state["answered_questions"]
+if answered and max(answered) >= len(QUESTIONS):
+    st.session_state["answered_questions"] = {i for i in answered if i < len(QUESTIONS)}
+
+if not QUIZ_SECRET_KEY:
+    st.warning(f"⚠️ 未偵測到加密金鑰，目前使用明文 {os.path.basename(bank_path)}。")
+
 # =====================================================
 # 🔐 登入頁
 # =====================================================
@@ -137,10 +230,101 @@ def page_login():
     if st.button("登入"):
         if username == APP_USER and password == APP_PASS:
             st.session_state["authenticated"] = True
+            # 以帳號 + 網址上的 sid 識別裝置；重新整理後網址不變，登入即可還原作答紀錄
+            sid = st.query_params.get("sid") or uuid.uuid4().hex[:12]
+            st.query_params["sid"] = sid
+            st.session_state["progress_id"] = f"{username}:{sid}"
+            st.session_state["username"] = username
+            # 主持人重新整理頁面後再次登入，可以接回原本的投影房間
+            st.session_state["live_room"] = live_session.find_room(st.session_state["progress_id"])
+            st.session_state["answered_questions"] = load_saved_progress()
             goto("home")
         else:
             st.error("帳號或密碼錯誤")
 
+# =====================================================
+# 🧩 局部重繪區塊（fragment）
+# =====================================================
+# 以下區塊內的按鈕 / 拉桿只會重跑該區塊，不會重跑整個 app
+# （全局樣式、題庫載入、整個題目方格都不必重送）。
+# 按鈕以 on_click 先更新狀態，區塊重跑時就會顯示新狀態，不必再呼叫 st.rerun()。
+@st.fragment
+def text_scale_panel():
+    st.session_state["text_scale"] = st.slider(
+        "選擇題目頁面文字縮放倍率 (基礎 1.1rem)",
+        min_value=1.0,
+        max_value=2.5,
+        value=st.session_state["text_scale"],
+        step=0.1,
+        format="%.1f 倍",
+        help="此倍率應用於題目頁面，基於全局字體大小 1.1rem 進行縮放。"
+    )
+
+@st.fragment
+def clear_progress_panel():
+    if not st.session_state["confirm_clear"]:
+        st.button("🧹 移除作答紀錄", on_click=set_state, kwargs={"confirm_clear": True})
+    else:
+        st.warning("⚠️ 是否確定要移除所有作答紀錄？")
+        sub_col1, sub_col2 = st.columns(2)
+        with sub_col1:
+            if st.button("✅ 是，清除紀錄"):
+                st.session_state["answered_questions"].clear()
+                save_progress()
+                st.success("✅ 已清除作答紀錄！")
+                st.session_state["confirm_clear"] = False
+                # 題目方格的顏色要跟著更新，這裡才重跑整個 app
+                st.rerun()
+        with sub_col2:
+            st.button("❌ 否", on_click=set_state, kwargs={"confirm_clear": False})
+
+@st.fragment
+def answer_panel(q_idx, q):
+    st.button("📜 解答", on_click=set_state, kwargs={"show_answer_dialog": True})
+
+    if st.session_state["show_answer_dialog"]:
+        st.info("❓ 是否要公布答案？")
+        col1, col2, _ = st.columns([1, 1, 3])
+        with col1:
+            st.button("✅ 是", on_click=reveal_answer, args=(q_idx,))
+        with col2:
+            st.button("❌ 否", on_click=set_state, kwargs={"show_answer_dialog": False})
+
+    if st.session_state["show_answer"]:
+        st.success(f"✅ 正確答案：{q.answer}")
+        st.info(f"💡 解釋：{q.explanation}")
+        if q_idx not in st.session_state["answered_questions"]:
+            st.session_state["answered_questions"].add(q_idx)
+            save_progress()
+
+    # 公布答案只會重跑這個區塊，所以在這裡也同步給觀眾
+    sync_live()
+
+SEARCH_LIMIT = 10
+
+@st.fragment
+def search_panel():
+    # 搜尋框只重跑這個區塊；n-gram 索引在伺服器預熱時建好（見 quiz_bank），不會逐題比對
+    query = st.text_input("🔎 搜尋題目（題號、題目、選項或解釋中的文字）", key="search_query")
+    if not query.strip():
+        return
+    with metrics.phase("search"):
+        results = QUESTIONS.search(query, limit=SEARCH_LIMIT)
+    if not results:
+        st.info("找不到符合的題目")
+        return
+    for idx in results:
+        q = QUESTIONS[idx]
+        text = q.question if len(q.question) <= 40 else q.question[:40] + "…"
+        if st.button(f"{q.label}（{q.group}）：{text}", key=f"search_hit_{idx}"):
+            goto_question(idx)
+
+@st.fragment(run_every=live_session.POLL_SECONDS)
+def live_follow_panel(code):
+    # 觀眾頁面：定期只重跑這個區塊比對 version，主持人換題或公布答案時才重跑整個頁面
+    if live_session.version(code) != st.session_state["live_version"]:
+        st.rerun()
+
 # =====================================================
 # 📚 題目集合頁
 # =====================================================
@@ -150,60 +334,32 @@ def page_home():
 
     st.title("📚 腦光一閃題目集合")
 
+    # ---- 題庫選擇 ----
+    if len(BANKS) > 1:
+        names = list(BANKS)
+        st.selectbox(
+            "📂 選擇題庫",
+            names,
+            index=names.index(st.session_state["bank"]),
+            key="bank_selector",
+            on_change=select_bank,
+        )
+
+    # ---- 搜尋 ----
+    search_panel()
+
     # ---- 分組顯示 ----
-    groups = {}
-    for i, q in enumerate(QUESTIONS):
-        groups.setdefault(q["q_group"], []).append((i, q))
-
-    cols = st.columns(len(groups))
-
-    for c_idx, (group, items) in enumerate(groups.items()):
-        with cols[c_idx]:
-            st.markdown(f"### 🟩 {group}")
-            for idx, q in items:
-                q_type = q.get("q_type", "q")
-
-                # 判斷顏色
-                if idx in st.session_state["answered_questions"]:
-                    color = "#000000"
-                    text_color = "#FFFFFF"
-                elif q_type == "warm_up":
-                    color = "#FFD8A8"
-                    text_color = "#000000"
-                else:
-                    color = "#E2ECF9"
-                    text_color = "#000000"
-
-                st.markdown(
-                    f"""
-                    <div style="
-                        background-color:{color};
-                        color:{text_color};
-                        border-radius:10px;
-                        padding:0.3em 0.1em;
-                        margin-bottom:0.4em;
-                        text-align:center;">
-                    """,
-                    unsafe_allow_html=True,
-                )
-
-                if st.button(f"題目 {idx + 1}", key=f"btn_{idx}", use_container_width=True):
-                    goto_question(idx)
-
-                st.markdown("</div>", unsafe_allow_html=True)
+    # 整個方格是單一元件（分組、暖身題、已作答題目的索引），方塊在瀏覽器端產生，
+    # 分段加密題庫也不必為了首頁解密任何一題
+    with metrics.phase("grid"):
+        clicked = quiz_grid(QUESTIONS, st.session_state["answered_questions"], key=f"grid_{QUESTIONS.name}")
+    if clicked is not None:
+        goto_question(clicked)
 
     # ✅ 新增：文字縮放拉桿
     st.divider()
     st.markdown("### 🔍 題目文字大小調整")
-    st.session_state["text_scale"] = st.slider(
-        "選擇題目頁面文字縮放倍率 (基礎 1.1rem)",
-        min_value=1.0,
-        max_value=2.5,
-        value=st.session_state["text_scale"],
-        step=0.1,
-        format="%.1f 倍",
-        help="此倍率應用於題目頁面，基於全局字體大小 1.1rem 進行縮放。"
-    )
+    text_scale_panel()
 
     # ---- 底部操作區 ----
     st.divider()
@@ -215,72 +371,43 @@ def page_home():
             goto("login")
 
     with col2:
-        if not st.session_state["confirm_clear"]:
-            if st.button("🧹 移除作答紀錄"):
-                st.session_state["confirm_clear"] = True
-                st.rerun()
-        else:
-            st.warning("⚠️ 是否確定要移除所有作答紀錄？")
-            sub_col1, sub_col2 = st.columns(2)
-            with sub_col1:
-                if st.button("✅ 是，清除紀錄"):
-                    st.session_state["answered_questions"].clear()
-                    components.html(
-                        "<script>localStorage.removeItem('bible_quiz_progress');</script>",
-                        height=0,
-                    )
-                    st.success("✅ 已清除作答紀錄！")
-                    st.session_state["confirm_clear"] = False
-                    st.rerun()
-            with sub_col2:
-                if st.button("❌ 否"):
-                    st.session_state["confirm_clear"] = False
-                    st.rerun()
+        clear_progress_panel()
 
     with col3:
-        if st.button("🔍 檢查 LocalStorage"):
-            components.html(
-                """
-                <script>
-                const data = localStorage.getItem('bible_quiz_progress');
-                alert('目前 LocalStorage 紀錄：\\n' + (data ? data : '（尚無資料）'));
-                </script>
-                """,
-                height=0,
-            )
+        if st.button("🔍 檢查作答紀錄"):
+            answered = sorted(st.session_state["answered_questions"])
+            if answered:
+                st.info("目前作答紀錄：" + "、".join(str(i + 1) for i in answered))
+            else:
+                st.info("目前作答紀錄：（尚無資料）")
+
+    # ---- 投影模式（主持人） ----
+    st.divider()
+    if st.session_state["live_room"] is None:
+        st.button("📡 開始投影（主持人）", on_click=start_live)
+    else:
+        code = st.session_state["live_room"]
+        st.info(f"📡 投影中，房間代碼：**{code}**。觀眾開啟本站網址並加上 `?live={code}` 即可跟著顯示題目與答案。")
+        st.button("⏹️ 結束投影", on_click=stop_live)
+
+    if can_open("metrics"):
+        st.button("📈 效能指標", on_click=set_state, kwargs={"page": "metrics"})
+    if can_open("analytics"):
+        st.button("📊 作答分析", on_click=set_state, kwargs={"page": "analytics"})
 
 # =====================================================
 # 📖 題目頁
 # =====================================================
+def apply_text_scale():
+    # 放大題目頁字體：每個倍率的樣式已預先產生（styles.py）
+    with metrics.phase("css_scale"):
+        st.markdown(styles.scale_style(st.session_state["text_scale"]), unsafe_allow_html=True)
+
 def page_question():
     if not st.session_state["authenticated"]:
         goto("login")
 
-    # 讀取縮放倍率
-    scale = st.session_state["text_scale"] 
-    
-    # 設置基礎大小 (base_rem = 1.1rem，取自全局樣式)
-    base_rem = 1.1 
-    
-    # 計算新的 rem 值
-    new_font_size = base_rem * scale 
-    new_button_size = base_rem * scale * 0.9 # 按鈕稍微小一點
-    
-    # 應用放大字體（題目頁）
-    st.markdown(f"""
-    <style>
-    /* 調整字體大小，使用動態計算的 rem 值 */
-    h1, h2, h3, h4, h5, p, span, div, li {{
-        font-size: {new_font_size:.2f}rem !important;
-        line-height: 1.5em !important;
-    }}
-    button, [data-testid="stButton"] button {{
-        font-size: {new_button_size:.2f}rem !important; 
-        padding: 0.4em 1em !important;
-    }}
-    .stAlert {{ font-size: {new_button_size:.2f}rem !important; }}
-    </style>
-    """, unsafe_allow_html=True)
+    apply_text_scale()
 
     st.markdown("### 📖 題目頁面")
 
@@ -290,42 +417,15 @@ def page_question():
             raise ValueError("題目不存在")
 
         q = QUESTIONS[q_idx]
-        st.markdown(f"#### 題目 {q_idx + 1}")
-        st.write(q["question"])
+        st.markdown(f"#### {q.label}")
+        st.write(q.question)
         # st.write("---")
 
-        # ✅ 修改處：支援 A, B, C, D 並加入檢查
-        for opt in ["A", "B", "C", "D"]:
-            if opt in q and q[opt]: # 確保 JSON 中有該選項
-                st.write(f"**({opt})** {q[opt]}")
-
-        if st.button("📜 解答"):
-            st.session_state["show_answer_dialog"] = True
-            st.rerun()
-
-        if st.session_state["show_answer_dialog"]:
-            st.info("❓ 是否要公布答案？")
-            col1, col2, _ = st.columns([1, 1, 3])
-            with col1:
-                if st.button("✅ 是"):
-                    st.session_state["show_answer"] = True
-                    st.session_state["show_answer_dialog"] = False
-                    st.rerun()
-            with col2:
-                if st.button("❌ 否"):
-                    st.session_state["show_answer_dialog"] = False
-                    st.rerun()
-
-        if st.session_state["show_answer"]:
-            st.success(f"✅ 正確答案：{q['answer']}")
-            st.info(f"💡 解釋：{q['explanation']}")
-            if q_idx not in st.session_state["answered_questions"]:
-                st.session_state["answered_questions"].append(q_idx)
-            # 同步進 LocalStorage
-            components.html(
-                f"<script>localStorage.setItem('bible_quiz_progress', '{json.dumps(st.session_state['answered_questions'])}');</script>",
-                height=0,
-            )
+        # ✅ 選項在載入題庫時已過濾空白，依 A, B, C, D 順序排好
+        for opt, text in q.options:
+            st.write(f"**({opt})** {text}")
+
+        answer_panel(q_idx, q)
 
     except Exception as e:
         st.error(f"⚠️ 題目載入錯誤：{e}")
@@ -338,28 +438,168 @@ def page_question():
     with col2:
         st.button("🚪 登出", on_click=lambda: goto("login"))
 
+# =====================================================
+# 📡 觀眾投影頁（?live=房間代碼，不需登入）
+# =====================================================
+def page_live():
+    if LIVE_ROOM is None:
+        st.error("❌ 找不到投影房間：代碼錯誤，或主持人已結束投影。")
+        return
+
+    st.session_state["live_version"] = LIVE_ROOM["version"]
+    apply_text_scale()
+    st.markdown(f"### 📡 投影中（房間 {LIVE_ROOM['code']}）")
+
+    q_idx = LIVE_ROOM["current_q"]
+    if q_idx is None or LIVE_ROOM["bank"] != st.session_state["bank"] or q_idx >= len(QUESTIONS):
+        st.info("⏳ 等待主持人選擇題目…")
+    else:
+        q = QUESTIONS[q_idx]
+        st.markdown(f"#### {q.label}")
+        st.write(q.question)
+        for opt, text in q.options:
+            st.write(f"**({opt})** {text}")
+        if LIVE_ROOM["show_answer"]:
+            st.success(f"✅ 正確答案：{q.answer}")
+            st.info(f"💡 解釋：{q.explanation}")
+
+    live_follow_panel(LIVE_ROOM["code"])
+
+# =====================================================
+# 📈 效能指標頁（管理者，QUIZ_METRICS=1）
+# =====================================================
+def page_metrics():
+    if not can_open("metrics"):
+        goto("home")
+
+    st.title("📈 效能指標")
+    snap = metrics.snapshot()
+    bank = snap["bank_stats"]
+    hit_rate = bank["hits"] / (bank["hits"] + bank["loads"]) if bank["hits"] + bank["loads"] else 0.0
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("活躍 session", snap["active_sessions"])
+    col2.metric("累計 session", snap["sessions_seen"])
+    col3.metric("題庫快取命中率", f"{hit_rate:.1%}")
+    col4.metric("快取中的題庫", bank["cached_banks"])
+
+    if snap["reload_errors"]:
+        st.markdown("#### ⚠️ 更新後無法載入的題庫（仍使用舊版本）")
+        st.table([{"題庫檔案": path, "錯誤": error} for path, error in sorted(snap["reload_errors"].items())])
+
+    st.markdown("#### ⏱️ 各階段耗時（毫秒）")
+    st.table([
+        {
+            "階段": name,
+            "次數": p["count"],
+            "平均": round(p["avg_seconds"] * 1000, 2),
+            "p50": round(p["quantiles"][0.5] * 1000, 2),
+            "p95": round(p["quantiles"][0.95] * 1000, 2),
+            "最大": round(p["max_seconds"] * 1000, 2),
+        }
+        for name, p in sorted(snap["phases"].items())
+    ])
+
+    st.markdown("#### 🔁 各頁面 rerun 次數")
+    st.table([{"頁面": page, "次數": n} for page, n in sorted(snap["page_reruns"].items())])
+
+    st.markdown("#### 👥 rerun 最多的 session")
+    st.table([
+        {"session": s["session"], "rerun": s["reruns"], "閒置秒數": round(s["idle_seconds"], 1)}
+        for s in snap["sessions"][:20]
+    ])
+
+    with st.expander("Prometheus 文字格式"):
+        st.code(metrics.prometheus_text(snap), language="text")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button("🔄 重新整理")
+    with col2:
+        st.button("🏠 回首頁", on_click=set_state, kwargs={"page": "home"})
+
+# =====================================================
+# 📊 作答分析頁（管理者）
+# =====================================================
+ANALYTICS_COLUMNS = {
+    "q_group": "分組",
+    "opens": "開題次數",
+    "open_sessions": "開題隊數",
+    "reveals": "公布次數",
+    "reveal_sessions": "公布隊數",
+    "reveal_rate": "公布率",
+    "think_median": "思考秒數（中位數）",
+    "think_mean": "思考秒數（平均）",
+}
+
+def analytics_table(df):
+    table = df.drop(columns=["bank", "version"]).rename(columns=ANALYTICS_COLUMNS)
+    if "q_idx" in table:
+        table.insert(0, "題目", [quiz_bank.question_label(i) for i in table.pop("q_idx")])
+    table["公布率"] = table["公布率"].map(lambda v: "-" if v != v else f"{v:.0%}")
+    return table.round(1)
+
+def page_analytics():
+    if not can_open("analytics"):
+        goto("home")
+
+    st.title("📊 作答分析")
+    bank = st.session_state["bank"]
+    # 只有這一頁會讀資料庫並載入 pandas；作答時的事件寫入都在背景進行
+    events = analytics.load_events(bank)
+    stats = analytics.stats()
+    st.caption(
+        f"題庫 {bank}：所有版本共 {len(events)} 筆事件（本程序已寫入 {stats['written']} 筆、"
+        f"佇列已滿丟棄 {stats['dropped']} 筆）"
+    )
+
+    # 題庫熱更新後題目可能增刪或換位置：一次只看一個版本，預設為目前版本，最近有事件的版本排前面
+    versions = list(events.groupby("version")["ts"].max().sort_values(ascending=False).index)
+    if BANK_VERSION in versions:
+        versions.remove(BANK_VERSION)
+    versions.insert(0, BANK_VERSION)
+    if len(versions) > 1:
+        version = st.selectbox(
+            "題庫版本", versions,
+            format_func=lambda v: f"{v}（目前版本）" if v == BANK_VERSION else (v or "未記錄版本"),
+        )
+        events = events[events["version"] == version]
+    else:
+        events = events[events["version"] == BANK_VERSION]
+
+    if events.empty:
+        st.info("這個版本還沒有開題或公布答案的紀錄")
+    else:
+        per_question, per_group = analytics.summarize(events)
+        st.markdown("#### 🟩 各分組")
+        st.dataframe(analytics_table(per_group), hide_index=True, use_container_width=True)
+        st.markdown("#### 📘 各題")
+        st.dataframe(analytics_table(per_question), hide_index=True, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button("🔄 重新整理")
+    with col2:
+        st.button("🏠 回首頁", on_click=set_state, kwargs={"page": "home"})
+
 # =====================================================
 # 🚦 頁面路由
 # =====================================================
 page = st.session_state["page"]
-if page == "login":
-    page_login()
-elif page == "home":
-    page_home()
-elif page == "question":
-    page_question()
-
-# =====================================================
-# 🧠 啟動時從 LocalStorage 嘗試載入進度
-# =====================================================
-components.html(
-    """
-    <script>
-    const progress = localStorage.getItem('bible_quiz_progress');
-    if (progress) {{
-        const pycmd = "st.session_state.answered_questions = JSON.parse('" + progress + "')";
-    }}
-    </script>
-    """,
-    height=0,
-)
\ No newline at end of file
+metrics.record_rerun(page, st.session_state["session_id"])
+sync_live()
+with metrics.phase(f"page_{page}"):
+    if page == "login":
+        page_login()
+    elif page == "home":
+        page_home()
+    elif page == "question":
+        page_question()
+    elif page == "metrics":
+        page_metrics()
+    elif page == "analytics":
+        page_analytics()
+    elif page == "live":
+        page_live()
+
+startup.first_page()
@@ -0,0 +1,87 @@
+# bank_watcher.py
+# =====================================================
+# 👀 題庫熱更新（watchdog）
+# =====================================================
+# 監看題庫目錄，題庫檔案（.enc / .json）寫入或被取代時，在背景重新解密並驗證，
+# 成功後才換掉 quiz_bank 快取中的題庫；之後的 rerun 直接拿到新版本，不必重啟、
+# 也不會有人在 rerun 中等解密。新版本有誤時繼續使用舊版本（見 quiz_bank.load_bank）。
+# 只重新載入目前在快取中的題庫，其他題庫等第一次被選到時再載入。
+# QUIZ_BANK_WATCH=0 可關閉。
+import os
+import threading
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+import quiz_bank
+
+ENABLED = os.environ.get("QUIZ_BANK_WATCH", "1").lower() not in ("0", "false", "no")
+# 編輯器與 encrypt_quiz_file.py 存檔時會連續觸發多個事件，等檔案穩定後再載入
+DEBOUNCE_SECONDS = float(os.environ.get("QUIZ_BANK_WATCH_DEBOUNCE", "1.0"))
+
+_observer = None
+_start_lock = threading.Lock()
+
+
+class BankChangeHandler(FileSystemEventHandler):
+    def __init__(self, key):
+        super().__init__()
+        self._key = key
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if path and path.endswith(quiz_bank.BANK_EXTENSIONS):
+                self._schedule(os.path.abspath(path))
+
+    def _schedule(self, path):
+        with self._lock:
+            timer = self._timers.get(path)
+            if timer is not None:
+                timer.cancel()
+            timer = threading.Timer(DEBOUNCE_SECONDS, self._reload, args=(path,))
+            timer.daemon = True
+            self._timers[path] = timer
+            timer.start()
+
+    def _reload(self, path):
+        with self._lock:
+            self._timers.pop(path, None)
+        previous = quiz_bank.cached_bank(path)
+        if previous is None or not os.path.exists(path):
+            return
+        try:
+            bank = quiz_bank.reload_bank(path, self._key)
+        except Exception as e:
+            print(f"⚠️ 題庫 {os.path.basename(path)} 重新載入失敗：{e}")
+            return
+        if bank is not previous:
+            print(f"🔄 題庫 {bank.name} 已更新（{len(bank)} 題）")
+
+
+def start(directory=None, key=None):
+    """ 啟動背景監看（整個程序只會啟動一次）；回傳是否正在監看 """
+    global _observer
+    if not ENABLED:
+        return False
+    if _observer is not None:
+        return True
+    with _start_lock:
+        if _observer is None:
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(BankChangeHandler(key), directory or quiz_bank.BANK_DIR, recursive=False)
+            observer.start()
+            _observer = observer
+    return True
+
+
+def stop():
+    global _observer
+    with _start_lock:
+        if _observer is not None:
+            _observer.stop()
+            _observer = None
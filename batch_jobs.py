@@ -0,0 +1,76 @@
+# batch_jobs.py
+# =====================================================
+# 🧰 批次命令列工具共用：平行處理、讀取金鑰、寫出輸出檔
+# =====================================================
+# encrypt_quiz_file.py、gen_ppt.py、gen_html.py 一次處理多個題庫時共用這些函式：
+#   run_jobs        process pool 平行處理，單一檔案失敗只記下錯誤，不影響其他檔案
+#   check_outputs   多個輸入對應到同一個輸出檔時直接拒絕（例如 a/q.json 與 b/q.json 搭配 --out-dir）
+#   atomic_output   寫到唯一的暫存檔再換名：執行中的 app 不會讀到寫了一半的檔案，
+#                   同時寫同一個輸出的 process 也不會共用暫存檔；失敗時刪除暫存檔
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+
+def read_secret(value=None, file_path=None, env_name=None):
+    """ 金鑰 / 密語：檔案優先，其次是命令列參數，最後是環境變數 """
+    if file_path:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    return value or (os.environ.get(env_name) if env_name else None)
+
+
+def error_text(e):
+    # cryptography 的 InvalidToken 等例外沒有訊息，至少留下例外名稱
+    return str(e) or type(e).__name__
+
+
+def run_jobs(func, jobs, workers):
+    """ 多個檔案時用 process pool 平行處理；回傳 [(結果, 錯誤)]，順序與輸入相同 """
+    outcomes = []
+    if workers == 1 or len(jobs) == 1:
+        for job in jobs:
+            try:
+                outcomes.append((func(*job), None))
+            except Exception as e:
+                outcomes.append((None, e))
+        return outcomes
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, *job) for job in jobs]
+        for future in futures:
+            try:
+                outcomes.append((future.result(), None))
+            except Exception as e:
+                outcomes.append((None, e))
+    return outcomes
+
+
+def check_outputs(output_paths):
+    """ 兩個輸入寫到同一個輸出檔時結束程式（平行寫入會互相覆蓋、檔案損毀） """
+    seen = {}
+    for path in output_paths:
+        key = os.path.normcase(os.path.abspath(path))
+        if key in seen:
+            raise SystemExit(f"❌ 多個題庫會輸出到同一個檔案：{path}（請改名或分開輸出目錄）")
+        seen[key] = path
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def atomic_output(path, mode="wb", **kwargs):
+    """ 以唯一的暫存檔寫出，區塊正常結束才換名成 path；例外時刪除暫存檔 """
+    tmp_path = f"{path}.{uuid.uuid4().hex[:12]}.tmp"
+    try:
+        # "x"：暫存檔名已存在就失敗，不會寫進別人的暫存檔
+        with open(tmp_path, mode.replace("w", "x"), **kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        remove_quietly(tmp_path)
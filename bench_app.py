@@ -0,0 +1,209 @@
+# bench_app.py
+# =====================================================
+# ⏱️ app.py rerun 延遲基準測試
+# =====================================================
+# 以 Streamlit 的 AppTest 在本機（不開瀏覽器）執行 app.py，
+# 對 50 / 500 / 5000 題的合成題庫量測每個頁面的 rerun 時間、元件數與記憶體峰值，
+# 輸出 JSON 供不同 commit 之間比較。
+# 用法：
+#   python bench_app.py                                  # 預設 50/500/5000 題，每頁 20 次
+#   python bench_app.py --sizes 50 500 --repeat 10 --output bench.json
+#   python bench_app.py --format chunked                 # 以 QZB1 分段加密題庫測試
+#   python bench_app.py --compare bench_main.json        # 與基準比較，變慢超過門檻則 exit 1
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from percentiles import percentile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(ROOT, "app.py")
+DEFAULT_SIZES = (50, 500, 5000)
+PAGES = ("login", "home", "question")
+BENCH_USER, BENCH_PASS = "bench", "bench"
+
+
+def synthetic_records(n):
+    """ 合成題庫：5 個分組、前 5% 為暖身題，題目與解釋長度接近實際題庫 """
+    groups = ["創世記", "出埃及記", "詩篇", "馬太福音", "使徒行傳"]
+    warm_up = max(1, n // 20)
+    return [
+        {
+            "q_group": groups[i % len(groups)],
+            "q_type": "warm_up" if i < warm_up else "q",
+            "question": f"第 {i + 1} 題：" + "以下哪一位是聖經中的人物？" * 3,
+            "A": "挪亞", "B": "摩西", "C": "亞伯拉罕", "D": "大衛" if i % 4 else "",
+            "answer": "A",
+            "explanation": "參考經文與說明。" * 10,
+        }
+        for i in range(n)
+    ]
+
+
+def write_banks(directory, sizes, fmt, key):
+    from cryptography.fernet import Fernet
+
+    from encrypt_quiz_file import write_chunked_bank, write_fernet_bank
+
+    for n in sizes:
+        records = synthetic_records(n)
+        if fmt == "json":
+            with open(os.path.join(directory, f"bench_{n}.json"), "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False)
+        elif fmt == "chunked":
+            write_chunked_bank(records, os.path.join(directory, f"bench_{n}.enc"), Fernet(key.encode()))
+        else:
+            write_fernet_bank(records, os.path.join(directory, f"bench_{n}.enc"), Fernet(key.encode()))
+
+
+def count_elements(node):
+    children = getattr(node, "children", None)
+    if children is None:
+        return 1
+    return sum(count_elements(child) for child in children.values())
+
+
+def _new_app(bank, page, n):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.query_params["bank"] = bank
+    at.query_params["sid"] = "bench"
+    if page != "login":
+        at.session_state["authenticated"] = True
+        at.session_state["progress_id"] = f"{BENCH_USER}:bench"
+        at.session_state["page"] = page
+        at.session_state["current_q"] = n // 2
+    return at
+
+
+def _run(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+
+def bench_page(bank, page, n, repeat):
+    """ 第一次 run 當暖身（含題庫冷載入），之後量測 repeat 次 rerun """
+    at = _new_app(bank, page, n)
+    started = time.perf_counter()
+    _run(at)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _run(at)
+        times.append((time.perf_counter() - started) * 1000)
+    elements = count_elements(at.main) + count_elements(at.sidebar)
+
+    # 記憶體另外量測，避免 tracemalloc 的額外成本影響計時
+    tracemalloc.start()
+    _run(at)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times.sort()
+    return {
+        "first_ms": round(first_ms, 2),
+        "median_ms": round(statistics.median(times), 2),
+        "p95_ms": round(percentile(times, 95), 2),
+        "min_ms": round(times[0], 2),
+        "elements": elements,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, repeat, fmt):
+    workdir = tempfile.mkdtemp(prefix="bible_quiz_bench_")
+    key = None
+    if fmt != "json":
+        from cryptography.fernet import Fernet
+
+        key = Fernet.generate_key().decode()
+        os.environ["QUIZ_SECRET_KEY"] = key
+    else:
+        os.environ.pop("QUIZ_SECRET_KEY", None)
+    os.environ["QUIZ_BANK_DIR"] = workdir
+    os.environ["QUIZ_PROGRESS_DB"] = os.path.join(workdir, "progress.db")
+    os.environ["BIBLE_QUIZ_USER"], os.environ["BIBLE_QUIZ_PASS"] = BENCH_USER, BENCH_PASS
+    sys.path.insert(0, ROOT)
+    write_banks(workdir, sizes, fmt, key)
+
+    results = []
+    for n in sizes:
+        for page in PAGES:
+            result = {"size": n, "page": page, **bench_page(f"bench_{n}", page, n, repeat)}
+            results.append(result)
+            print(f"  {n:>5} 題  {page:<8}  median {result['median_ms']:>8.2f} ms  "
+                  f"p95 {result['p95_ms']:>8.2f} ms  元件 {result['elements']:>5}  "
+                  f"記憶體峰值 {result['peak_kib']:>9.1f} KiB")
+    return {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "format": fmt,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """ 與基準比較 median；變慢超過 threshold（比例）就列為退步，回傳退步數 """
+    base = {(r["size"], r["page"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\n📊 與基準 {baseline.get('commit')} 比較（門檻 +{threshold:.0%}）")
+    for r in current["results"]:
+        old = base.get((r["size"], r["page"]))
+        if old is None:
+            continue
+        change = (r["median_ms"] - old["median_ms"]) / old["median_ms"] if old["median_ms"] else 0.0
+        mark = "❌" if change > threshold else "✅"
+        regressions += change > threshold
+        print(f"  {mark} {r['size']:>5} 題  {r['page']:<8}  {old['median_ms']:>8.2f} → "
+              f"{r['median_ms']:>8.2f} ms（{change:+.0%}）  元件 {old['elements']} → {r['elements']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="量測 app.py 各頁面的 rerun 延遲")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="合成題庫題數")
+    parser.add_argument("--repeat", type=int, default=20, help="每個頁面量測幾次 rerun")
+    parser.add_argument("--format", choices=("json", "fernet", "chunked"), default="json", help="題庫格式")
+    parser.add_argument("--output", help="結果 JSON 檔案路徑")
+    parser.add_argument("--compare", help="基準結果 JSON，用來比較是否退步")
+    parser.add_argument("--threshold", type=float, default=0.2, help="median 變慢超過此比例視為退步")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"⏱️ app.py rerun 基準測試（{args.format}，每頁 {args.repeat} 次）")
+    current = run_benchmarks(args.sizes, args.repeat, args.format)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 結果已寫入 {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
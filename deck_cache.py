@@ -0,0 +1,272 @@
+# deck_cache.py
+# =====================================================
+# ♻️ 簡報增量產生（投影片 XML 快取）
+# =====================================================
+# 每張投影片依「版面雜湊 + 種類 + 內容」算出快取鍵，渲染後的 slide XML 與 rels 存進快取目錄；
+# 下次產生時只重新渲染內容有變的投影片，其餘直接沿用，最後自行組成 .pptx（zip），
+# 不再透過 python-pptx 逐張 add_slide（每新增一張都要掃過所有關聯，整份簡報是 O(n²)）。
+# 會隨位置改變的超連結（例如題目頁的「看解答」）渲染時先用佔位字串 #@名稱，
+# 組裝時再換成實際頁碼，所以題目數量變動時不必重新渲染題目頁。
+import hashlib
+import io
+import json
+import os
+import re
+import time
+import zipfile
+
+from batch_jobs import atomic_output
+
+SLIDE_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+SLIDE_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+IMAGE_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+IMAGE_CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg", "jpeg": "image/jpeg", "gif": "image/gif"}
+# 每份暫存簡報最多渲染幾張，讓 python-pptx 的 O(n) add_slide 維持在小的 n
+RENDER_BATCH = 40
+FIRST_SLIDE_ID = 256
+
+
+def link_placeholder(name):
+    """ 渲染時使用的超連結位址，組裝時換成 #頁碼 """
+    return f"@{name}"
+
+
+def layout_hash(*sources):
+    """ 版面雜湊：渲染程式碼、圖片等任何會影響投影片外觀的內容（bytes 或檔案路徑） """
+    h = hashlib.sha256()
+    for source in sources:
+        if isinstance(source, bytes):
+            h.update(source)
+        elif isinstance(source, str) and os.path.exists(source):
+            with open(source, "rb") as f:
+                h.update(f.read())
+        else:
+            h.update(repr(source).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class SlideCache:
+    """ 快取目錄：parts/<鍵>.xml、parts/<鍵>.rels、media/<雜湊>.<副檔名>、manifests/<簡報>.json """
+
+    def __init__(self, cache_dir, layout):
+        self.cache_dir = cache_dir
+        self.layout = layout
+        for sub in ("parts", "media", "manifests"):
+            os.makedirs(os.path.join(cache_dir, sub), exist_ok=True)
+
+    def key(self, kind, payload):
+        data = json.dumps([self.layout, kind, payload], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+    def _part_path(self, key, ext):
+        return os.path.join(self.cache_dir, "parts", f"{key}.{ext}")
+
+    def has(self, key):
+        return os.path.exists(self._part_path(key, "rels"))
+
+    def get(self, key):
+        with open(self._part_path(key, "xml"), "rb") as f:
+            xml = f.read()
+        with open(self._part_path(key, "rels"), "rb") as f:
+            rels = f.read()
+        return xml, rels
+
+    @staticmethod
+    def _write(path, data):
+        # 暫存檔名含 pid：批次模式下多個 process 可能同時寫入同一筆（例如共用的緩衝頁）
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put(self, key, xml, rels):
+        # rels 最後寫入：has() 以 rels 是否存在判斷，中途失敗不會留下半筆快取
+        self._write(self._part_path(key, "xml"), xml)
+        self._write(self._part_path(key, "rels"), rels)
+
+    def put_media(self, blob, ext):
+        name = f"{hashlib.sha1(blob).hexdigest()[:16]}.{ext}"
+        path = os.path.join(self.cache_dir, "media", name)
+        if not os.path.exists(path):
+            self._write(path, blob)
+        return name
+
+    def read_media(self, name):
+        with open(os.path.join(self.cache_dir, "media", name), "rb") as f:
+            return f.read()
+
+    def save_manifest(self, output_path, keys):
+        """ 記錄這份簡報用到的快取鍵 """
+        name = hashlib.sha256(os.path.abspath(output_path).encode()).hexdigest()[:16]
+        data = {"output": os.path.abspath(output_path), "keys": sorted(set(keys))}
+        self._write(
+            os.path.join(self.cache_dir, "manifests", f"{name}.json"),
+            json.dumps(data).encode("utf-8"),
+        )
+
+    def prune(self):
+        """ 刪除所有簡報都不再使用的快取，回傳刪除的檔案數 """
+        manifest_dir = os.path.join(self.cache_dir, "manifests")
+        used = set()
+        for filename in os.listdir(manifest_dir):
+            with open(os.path.join(manifest_dir, filename), "r", encoding="utf-8") as f:
+                used.update(json.load(f)["keys"])
+        removed = 0
+        parts_dir = os.path.join(self.cache_dir, "parts")
+        for filename in os.listdir(parts_dir):
+            if filename.split(".")[0] not in used:
+                os.remove(os.path.join(parts_dir, filename))
+                removed += 1
+
+        # 圖片只保留仍留下的投影片 rels 有引用的檔案
+        referenced = set()
+        for filename in os.listdir(parts_dir):
+            if filename.endswith(".rels"):
+                with open(os.path.join(parts_dir, filename), "rb") as f:
+                    referenced.update(name.decode() for name in _media_refs(f.read()))
+        media_dir = os.path.join(self.cache_dir, "media")
+        for filename in os.listdir(media_dir):
+            if filename not in referenced:
+                os.remove(os.path.join(media_dir, filename))
+                removed += 1
+        return removed
+
+
+# =====================================================
+# 🎨 渲染缺少的投影片
+# =====================================================
+def _media_refs(rels):
+    return re.findall(rb'Target="\.\./media/([^"]+)"', rels)
+
+
+def _render_missing(cache, plan, keys, new_presentation, render):
+    """ 只渲染快取中沒有的投影片；相同內容（例如所有緩衝頁）只渲染一次 """
+    missing = {}
+    for (kind, payload, _), key in zip(plan, keys):
+        if key not in missing and not cache.has(key):
+            missing[key] = (kind, payload)
+
+    items = list(missing.items())
+    for start in range(0, len(items), RENDER_BATCH):
+        prs = new_presentation()
+        for key, (kind, payload) in items[start:start + RENDER_BATCH]:
+            slide = render(prs, kind, payload)
+            part = slide.part
+            xml = part.blob
+            rels = part.rels.xml
+            # 圖片以內容雜湊命名，不同批次渲染的投影片共用同一個檔案
+            for rel in part.rels.values():
+                if rel.is_external or rel.reltype != IMAGE_REL_TYPE:
+                    continue
+                image = rel.target_part
+                name = cache.put_media(image.blob, image.partname.ext)
+                rels = rels.replace(
+                    f'Target="{rel.target_ref}"'.encode(), f'Target="../media/{name}"'.encode()
+                )
+            cache.put(key, xml, rels)
+    return len(items)
+
+
+# =====================================================
+# 📦 組裝 .pptx
+# =====================================================
+def _assemble(output_path, cache, plan, keys, new_presentation):
+    skeleton = io.BytesIO()
+    new_presentation().save(skeleton)
+    skeleton.seek(0)
+
+    slide_entries = []
+    media = {}
+    for k, ((_, _, links), key) in enumerate(zip(plan, keys), start=1):
+        xml, rels = cache.get(key)
+        for name, target in (links or {}).items():
+            rels = rels.replace(
+                f'Target="#{link_placeholder(name)}"'.encode(), f'Target="#{target}"'.encode()
+            )
+        for name in _media_refs(rels):
+            media.setdefault(name.decode(), None)
+        slide_entries.append((f"ppt/slides/slide{k}.xml", xml, f"ppt/slides/_rels/slide{k}.xml.rels", rels))
+
+    with atomic_output(output_path) as f, zipfile.ZipFile(skeleton) as zin, \
+            zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            data = zin.read(info.filename)
+            if info.filename == "[Content_Types].xml":
+                data = _content_types(data, len(slide_entries), media)
+            elif info.filename == "ppt/presentation.xml":
+                data, pres_rels = _presentation(data, zin.read("ppt/_rels/presentation.xml.rels"), len(slide_entries))
+            elif info.filename == "ppt/_rels/presentation.xml.rels":
+                continue
+            zout.writestr(info, data)
+        zout.writestr("ppt/_rels/presentation.xml.rels", pres_rels)
+        for slide_name, xml, rels_name, rels in slide_entries:
+            zout.writestr(slide_name, xml)
+            zout.writestr(rels_name, rels)
+        for name in media:
+            zout.writestr(f"ppt/media/{name}", cache.read_media(name))
+
+
+def _content_types(data, count, media):
+    text = data.decode("utf-8")
+    defaults = set(re.findall(r'<Default Extension="([^"]+)"', text))
+    extra = [
+        f'<Default Extension="{ext}" ContentType="{IMAGE_CONTENT_TYPES.get(ext, "image/" + ext)}"/>'
+        for ext in sorted({name.rsplit(".", 1)[-1] for name in media} - defaults)
+    ]
+    extra += [
+        f'<Override PartName="/ppt/slides/slide{k}.xml" ContentType="{SLIDE_CONTENT_TYPE}"/>'
+        for k in range(1, count + 1)
+    ]
+    return text.replace("</Types>", "".join(extra) + "</Types>").encode("utf-8")
+
+
+def _presentation(pres_xml, pres_rels, count):
+    """ 在 presentation.xml 加入 sldIdLst，並在 presentation.xml.rels 加入對應的關聯 """
+    rels_text = pres_rels.decode("utf-8")
+    next_rid = max(int(n) for n in re.findall(r'Id="rId(\d+)"', rels_text)) + 1
+    rids = [f"rId{next_rid + k}" for k in range(count)]
+    rels_text = rels_text.replace("</Relationships>", "".join(
+        f'<Relationship Id="{rid}" Type="{SLIDE_REL_TYPE}" Target="slides/slide{k}.xml"/>'
+        for k, rid in enumerate(rids, start=1)
+    ) + "</Relationships>")
+
+    sld_ids = "<p:sldIdLst>" + "".join(
+        f'<p:sldId id="{FIRST_SLIDE_ID + k}" r:id="{rid}"/>' for k, rid in enumerate(rids)
+    ) + "</p:sldIdLst>"
+    text = pres_xml.decode("utf-8")
+    # sldIdLst 必須在 sldMasterIdLst / notesMasterIdLst / handoutMasterIdLst 之後
+    anchor = max(text.rfind(tag) + len(tag) for tag in (
+        "</p:sldMasterIdLst>", "</p:notesMasterIdLst>", "</p:handoutMasterIdLst>",
+    ) if tag in text)
+    text = text[:anchor] + sld_ids + text[anchor:]
+    return text.encode("utf-8"), rels_text.encode("utf-8")
+
+
+def prune_unused(cache_dir):
+    """ 批次產生多份簡報時，全部完成後再統一清理（避免刪掉其他 process 剛渲染的投影片） """
+    return SlideCache(cache_dir, None).prune()
+
+
+def build_deck(output_path, plan, new_presentation, render, cache_dir, layout, prune=True):
+    """ 依 plan 產生簡報
+
+    plan：[(種類, 內容, {佔位名稱: 頁碼})]，內容需可 JSON 序列化，決定快取鍵
+    new_presentation()：回傳空白 Presentation（已設定投影片大小）
+    render(prs, 種類, 內容)：在 prs 新增一張投影片並回傳
+    回傳 {"slides", "rendered", "reused", "pruned", "seconds"}
+    """
+    started = time.perf_counter()
+    cache = SlideCache(cache_dir, layout)
+    keys = [cache.key(kind, payload) for kind, payload, _ in plan]
+    rendered = _render_missing(cache, plan, keys, new_presentation, render)
+    _assemble(output_path, cache, plan, keys, new_presentation)
+    cache.save_manifest(output_path, keys)
+    pruned = cache.prune() if prune else 0
+    return {
+        "slides": len(plan),
+        "rendered": rendered,
+        "reused": len(set(keys)) - rendered,
+        "pruned": pruned,
+        "seconds": time.perf_counter() - started,
+    }
@@ -1,21 +1,280 @@
 # encrypt_quiz_file.py
-from cryptography.fernet import Fernet
+# =====================================================
+# 🔐 題庫加密工具
+# =====================================================
+# 用法：
+#   python3 encrypt_quiz_file.py                         # 同以往：產生新金鑰，questions.json → questions.enc
+#   python3 encrypt_quiz_file.py a.json b.json --chunked --key-file key.txt --workers 4
+#   python3 encrypt_quiz_file.py --rotate *.enc --old-key-file old.txt --key-file new.txt
+import argparse
 import json
+import mmap
+import os
+import time
 
-# 1️⃣ 若沒有金鑰，先產生一次性金鑰
-key = Fernet.generate_key()
-print("🔑 Secret Key（請放到 Render 環境變數 QUIZ_SECRET_KEY）:\n", key.decode())
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 
-# 2️⃣ 讀取原始題庫
-with open("questions.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
+from batch_jobs import atomic_output, check_outputs, error_text, read_secret, remove_quietly, run_jobs
+from quiz_bank import (
+    CHUNK_INDEX_ENTRY,
+    CHUNK_TRAILER,
+    CHUNKED_MAGIC,
+    Question,
+    is_chunked_bank,
+    record_group,
+    record_type,
+)
 
-plain_text = json.dumps(data, ensure_ascii=False)
-fernet = Fernet(key)
-encrypted = fernet.encrypt(plain_text.encode())
+READ_CHUNK_SIZE = 1 << 16
+# --rotate 先把每個題庫換好金鑰寫到這個暫存檔，全部成功才一起換名
+ROTATE_SUFFIX = ".rotating"
 
-# 3️⃣ 寫出加密後檔案
-with open("questions.enc", "wb") as f:
-    f.write(encrypted)
 
-print("\n✅ 已建立加密題庫檔案：questions.enc")
+# =====================================================
+# 📥 串流讀取 JSON 陣列
+# =====================================================
+def iter_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    """ 逐筆讀出 JSON 陣列中的元素，不必把整份題庫載入記憶體 """
+    decoder = json.JSONDecoder()
+    buf = ""
+    while not buf:
+        more = f.read(chunk_size)
+        if not more:
+            raise ValueError("題庫 JSON 是空的")
+        buf = more.lstrip()
+    if buf[0] != "[":
+        raise ValueError("題庫 JSON 必須是陣列")
+    buf = buf[1:]
+
+    first, expect_item = True, True
+    while True:
+        buf = buf.lstrip()
+        if not buf:
+            more = f.read(chunk_size)
+            if not more:
+                raise ValueError("題庫 JSON 陣列沒有結尾")
+            buf = more
+            continue
+        if buf[0] == "]" and (first or not expect_item):
+            return
+        if not expect_item:
+            if buf[0] != ",":
+                raise ValueError(f"題庫 JSON 格式錯誤：預期逗號，讀到 {buf[:20]!r}")
+            buf, expect_item = buf[1:], True
+            continue
+        try:
+            item, end = decoder.raw_decode(buf)
+        except json.JSONDecodeError:
+            # 這一筆還沒讀完整，再多讀一段
+            more = f.read(chunk_size)
+            if not more:
+                raise
+            buf += more
+            continue
+        yield item
+        buf, first, expect_item = buf[end:], False, False
+
+
+# =====================================================
+# 📦 QZB1 分段加密格式寫出
+# =====================================================
+def _write_chunked_file(output_path, tokens, make_meta):
+    """ 依序寫出每題的 Fernet token，最後寫 meta、題目索引與檔尾
+
+    先寫到暫存檔再換名，執行中的 app 不會讀到寫了一半的檔案；中途失敗時刪除暫存檔。
+    回傳寫出的題數。
+    """
+    index = []
+    with atomic_output(output_path) as f:
+        f.write(CHUNKED_MAGIC)
+        for token in tokens:
+            index.append((f.tell(), len(token)))
+            f.write(token)
+
+        meta = make_meta()
+        meta_offset = f.tell()
+        f.write(meta)
+
+        index_offset = f.tell()
+        for offset, length in index:
+            f.write(CHUNK_INDEX_ENTRY.pack(offset, length))
+        f.write(CHUNK_TRAILER.pack(index_offset, len(index), meta_offset, len(meta), CHUNKED_MAGIC))
+    return len(index)
+
+
+def write_chunked_bank(records, output_path, fernet):
+    """ 寫出 QZB1 分段加密題庫；records 可以是任何可迭代物件，逐題加密寫出 """
+    groups, types = [], []
+
+    def tokens():
+        for i, record in enumerate(records):
+            Question(i, record)  # 先檢查必要欄位，格式錯誤就不寫出
+            groups.append(record_group(record))
+            types.append(record_type(record))
+            yield fernet.encrypt(json.dumps(record, ensure_ascii=False).encode())
+
+    def make_meta():
+        return fernet.encrypt(json.dumps({"groups": groups, "types": types}, ensure_ascii=False).encode())
+
+    return _write_chunked_file(output_path, tokens(), make_meta)
+
+
+def write_fernet_bank(records, output_path, fernet):
+    """ 寫出單一 Fernet token 的題庫（原本的格式）；Fernet 需要完整明文，無法串流 """
+    records = list(records)
+    for i, record in enumerate(records):
+        Question(i, record)
+    encrypted = fernet.encrypt(json.dumps(records, ensure_ascii=False).encode())
+    with atomic_output(output_path) as f:
+        f.write(encrypted)
+    return len(records)
+
+
+# =====================================================
+# ⚙️ 單一檔案的工作（在 process pool 中執行）
+# =====================================================
+def encrypt_file(input_path, output_path, key, chunked):
+    started = time.perf_counter()
+    fernet = Fernet(key.encode())
+    with open(input_path, "r", encoding="utf-8") as f:
+        records = iter_json_array(f)
+        if chunked:
+            count = write_chunked_bank(records, output_path, fernet)
+        else:
+            count = write_fernet_bank(records, output_path, fernet)
+    return input_path, output_path, count, os.path.getsize(input_path), time.perf_counter() - started
+
+
+def rotate_file(path, old_keys, new_key, output_path=None):
+    """ 以 MultiFernet 把題庫換成新金鑰；只解密再加密 token，不解析題目內容
+
+    結果寫到 output_path（預設直接取代原檔）；--rotate 寫到暫存檔，所有題庫都成功才換名。
+    """
+    started = time.perf_counter()
+    output_path = output_path or path
+    multi = MultiFernet([Fernet(k.encode()) for k in [new_key, *old_keys]])
+    try:
+        count = _rotate_tokens(path, multi, output_path)
+    except InvalidToken:
+        raise ValueError("舊金鑰無法解密（金鑰不符或檔案損毀）") from None
+    return path, path, count, os.path.getsize(output_path), time.perf_counter() - started
+
+
+def _rotate_tokens(path, multi, output_path):
+    """ 換好金鑰寫到 output_path；回傳題數（單一 token 格式不解析題目，回傳 None） """
+    if is_chunked_bank(path):
+        # 以 mmap 逐題讀出 token，換好金鑰就寫出，不把整份檔案讀進記憶體
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            index_offset, count, meta_offset, meta_length, magic = CHUNK_TRAILER.unpack_from(
+                data, len(data) - CHUNK_TRAILER.size
+            )
+            if magic != CHUNKED_MAGIC:
+                raise ValueError(f"{path} 檔尾損毀")
+            index = CHUNK_INDEX_ENTRY.iter_unpack(
+                data[index_offset:index_offset + count * CHUNK_INDEX_ENTRY.size]
+            )
+            tokens = (multi.rotate(data[off:off + length]) for off, length in index)
+            meta = data[meta_offset:meta_offset + meta_length]
+            return _write_chunked_file(output_path, tokens, lambda: multi.rotate(meta))
+
+    with open(path, "rb") as f:
+        token = f.read()
+    with atomic_output(output_path) as f:
+        f.write(multi.rotate(token))
+    return None
+
+
+def _report(jobs, outcomes, started):
+    """ 列出每個檔案的結果與失敗原因；回傳失敗的檔案數 """
+    total_bytes, succeeded, failed = 0, 0, 0
+    for job, (result, error) in zip(jobs, outcomes):
+        if error is not None:
+            failed += 1
+            print(f"❌ {job[0]}：{error_text(error)}")
+            continue
+        input_path, output_path, count, size, seconds = result
+        succeeded += 1
+        total_bytes += size
+        mb_per_s = size / 1e6 / seconds if seconds else float("inf")
+        count_text = f"{count} 題，" if count is not None else ""
+        print(f"✅ {input_path} → {output_path}：{count_text}{size / 1e6:.2f} MB，"
+              f"{seconds:.3f} 秒（{mb_per_s:.1f} MB/s）")
+    elapsed = time.perf_counter() - started
+    print(f"\n📊 成功 {succeeded} 個、失敗 {failed} 個檔案，{total_bytes / 1e6:.2f} MB，{elapsed:.3f} 秒")
+    return failed
+
+
+def rotate_files(paths, old_keys, new_key, workers):
+    """ 全部換好金鑰（寫到暫存檔）才一起取代原檔；任何一個失敗時所有題庫都維持舊金鑰 """
+    started = time.perf_counter()
+    jobs = [(path, old_keys, new_key, path + ROTATE_SUFFIX) for path in paths]
+    try:
+        outcomes = run_jobs(rotate_file, jobs, workers)
+        failed = _report(jobs, outcomes, started)
+        if not failed:
+            for path, _, _, staged in jobs:
+                os.replace(staged, path)
+    finally:
+        for _, _, _, staged in jobs:
+            remove_quietly(staged)
+    if failed:
+        print("⚠️ 有題庫無法換金鑰，所有題庫都維持舊金鑰，未做任何變更")
+    return failed
+
+
+# =====================================================
+# 🚀 命令列
+# =====================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="加密題庫 JSON，或把既有 .enc 題庫換成新金鑰")
+    parser.add_argument("inputs", nargs="*",
+                        help="要加密的 JSON 題庫（預設 questions.json）；搭配 --rotate 時為 .enc 題庫")
+    parser.add_argument("--out-dir", help="輸出目錄（預設與輸入檔相同）")
+    parser.add_argument("--chunked", action="store_true", help="輸出 QZB1 分段加密格式")
+    parser.add_argument("--key", help="使用既有金鑰（不指定則產生新金鑰）")
+    parser.add_argument("--key-file", help="從檔案讀取金鑰，避免金鑰留在 shell 歷史紀錄")
+    parser.add_argument("--rotate", action="store_true", help="把 .enc 題庫從舊金鑰換成新金鑰")
+    parser.add_argument("--old-key", action="append", default=[],
+                        help="--rotate 用的舊金鑰，可重複指定（預設為環境變數 QUIZ_SECRET_KEY）")
+    parser.add_argument("--old-key-file", action="append", default=[], help="從檔案讀取舊金鑰，可重複指定")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="平行處理的 process 數")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    key = read_secret(args.key, args.key_file)
+    if not key:
+        # 1️⃣ 若沒有金鑰，先產生一次性金鑰
+        key = Fernet.generate_key().decode()
+        print("🔑 Secret Key（請放到 Render 環境變數 QUIZ_SECRET_KEY）:\n", key, "\n")
+
+    started = time.perf_counter()
+    if args.rotate:
+        old_keys = args.old_key + [read_secret(file_path=p) for p in args.old_key_file]
+        if not old_keys and os.environ.get("QUIZ_SECRET_KEY"):
+            old_keys = [os.environ["QUIZ_SECRET_KEY"]]
+        if not old_keys:
+            raise SystemExit("❌ --rotate 需要 --old-key / --old-key-file 或環境變數 QUIZ_SECRET_KEY")
+        if not args.inputs:
+            raise SystemExit("❌ --rotate 需要指定 .enc 題庫")
+        check_outputs(args.inputs)
+        failed = rotate_files(args.inputs, old_keys, key, args.workers)
+    else:
+        # 2️⃣ 讀取原始題庫，3️⃣ 寫出加密後檔案
+        jobs = []
+        for input_path in args.inputs or ["questions.json"]:
+            out_dir = args.out_dir or os.path.dirname(input_path)
+            name = os.path.splitext(os.path.basename(input_path))[0] + ".enc"
+            jobs.append((input_path, os.path.join(out_dir, name), key, args.chunked))
+        check_outputs(output_path for _, output_path, _, _ in jobs)
+        if args.out_dir:
+            os.makedirs(args.out_dir, exist_ok=True)
+        failed = _report(jobs, run_jobs(encrypt_file, jobs, args.workers), started)
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# gen_html.py
+# =====================================================
+# 📦 離線題庫網頁（單一 HTML 檔，不需伺服器）
+# =====================================================
+# 把題庫嵌入 quiz_offline_frontend/index.html，產生一個可直接開啟的 HTML 檔：
+# 分組方格、題目頁、公布答案與解釋、作答紀錄（存在瀏覽器 localStorage）都在瀏覽器端完成，
+# 換頁不必連線，適合網路不穩或人數很多的場地；檔案可放在隨身碟或任何靜態網站。
+# 指定密語時題庫以 AES-256-GCM 加密（金鑰由 PBKDF2-SHA256 從密語導出），開啟網頁後輸入密語才會在瀏覽器內解密。
+#
+# 用法：
+#   python3 gen_html.py questions.json                                   # → questions.html
+#   python3 gen_html.py questions.enc --key-file key.txt --passphrase-file pass.txt
+#   python3 gen_html.py banks/*.json banks/*.enc --out-dir site
+import argparse
+import base64
+import getpass
+import hashlib
+import html
+import json
+import os
+import time
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+import quiz_bank
+from batch_jobs import atomic_output, check_outputs, read_secret
+
+FRONTEND_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "quiz_offline_frontend", "index.html"
+)
+TITLE = "✨ 腦光一閃"
+# PBKDF2 迭代次數：瀏覽器解密一次約零點幾秒，讓猜密語的成本夠高
+PBKDF2_ITERATIONS = int(os.environ.get("QUIZ_BUNDLE_PBKDF2_ITERATIONS", "600000"))
+
+
+def bank_payload(bank):
+    """ 網頁使用的精簡格式：題目以 [題目, [[選項, 內容], ...], 答案, 解釋] 存放 """
+    return {
+        "name": bank.name,
+        "groups": [[group, list(indices)] for group, indices in bank.groups],
+        "warm_up": sorted(bank.warm_up),
+        "questions": [[q.question, [list(o) for o in q.options], q.answer, q.explanation] for q in bank],
+    }
+
+
+def encrypt_payload(plaintext, passphrase, iterations=PBKDF2_ITERATIONS):
+    """ 與瀏覽器 WebCrypto 相容：PBKDF2-SHA256 → AES-256-GCM（密文後附 16 bytes tag） """
+    salt = os.urandom(16)
+    iv = os.urandom(12)
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=iterations)
+    key = kdf.derive(passphrase.encode("utf-8"))
+    data = AESGCM(key).encrypt(iv, plaintext, None)
+    return {
+        "kdf": "PBKDF2-SHA256",
+        "iterations": iterations,
+        "salt": base64.b64encode(salt).decode(),
+        "iv": base64.b64encode(iv).decode(),
+        "data": base64.b64encode(data).decode(),
+    }
+
+
+def render_bundle(bank, passphrase=None, title=TITLE):
+    """ 回傳完整 HTML 字串 """
+    payload = bank_payload(bank)
+    plaintext = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # 作答紀錄以題庫內容區分：同一份題庫重新匯出（或重新加密）後紀錄仍保留
+    data = {"id": f"{bank.name}:{hashlib.sha256(plaintext).hexdigest()[:12]}"}
+    if passphrase:
+        data["encrypted"] = encrypt_payload(plaintext, passphrase)
+        embedded = json.dumps(data, separators=(",", ":"))
+    else:
+        data["bank"] = payload
+        embedded = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    # 嵌入 <script> 內：跳脫 <，題目內容不可能提前結束 script 標籤
+    embedded = embedded.replace("<", "\\u003c")
+
+    with open(FRONTEND_PATH, "r", encoding="utf-8") as f:
+        template = f.read()
+    return (
+        template
+        .replace("__QUIZ_TITLE__", html.escape(title))
+        .replace("__QUIZ_DATA__", embedded)
+    )
+
+
+def export_bank(input_path, output_path, key=None, passphrase=None):
+    """ 匯出一個題庫，回傳 (輸入, 輸出, 題數, 大小, 秒數) """
+    started = time.perf_counter()
+    bank = quiz_bank.compile_bank(input_path, key)
+    page = render_bundle(bank, passphrase, title=f"{TITLE}｜{bank.name}")
+    with atomic_output(output_path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return input_path, output_path, len(bank), os.path.getsize(output_path), time.perf_counter() - started
+
+
+# =====================================================
+# 🚀 命令列
+# =====================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="把題庫匯出成離線使用的單一 HTML 檔")
+    parser.add_argument("inputs", nargs="+", help="題庫檔案：明文 .json 或加密 .enc")
+    parser.add_argument("-o", "--output", help="輸出檔名（只有一個題庫時使用）")
+    parser.add_argument("--out-dir", help="輸出目錄（預設與題庫相同，檔名為 <題庫>.html）")
+    parser.add_argument("--key", help=".enc 題庫的金鑰（預設為環境變數 QUIZ_SECRET_KEY）")
+    parser.add_argument("--key-file", help="從檔案讀取金鑰")
+    parser.add_argument("--passphrase-file",
+                        help="網頁密語檔案；指定後題庫加密嵌入（也可用環境變數 QUIZ_BUNDLE_PASSPHRASE）")
+    parser.add_argument("--ask-passphrase", action="store_true", help="執行時輸入網頁密語")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    key = read_secret(args.key, args.key_file, "QUIZ_SECRET_KEY")
+    passphrase = read_secret(None, args.passphrase_file, "QUIZ_BUNDLE_PASSPHRASE")
+    if args.ask_passphrase:
+        passphrase = getpass.getpass("🔐 網頁密語：")
+        if passphrase != getpass.getpass("🔐 再輸入一次："):
+            raise SystemExit("❌ 兩次輸入的密語不同")
+    if args.output and len(args.inputs) > 1:
+        raise SystemExit("❌ 多個題庫時請用 --out-dir 指定輸出目錄")
+    jobs = []
+    for input_path in args.inputs:
+        if input_path.endswith(".enc") and not key:
+            raise SystemExit(f"❌ {input_path} 需要 --key / --key-file 或環境變數 QUIZ_SECRET_KEY")
+        out_dir = args.out_dir or os.path.dirname(input_path)
+        jobs.append((input_path, args.output or os.path.join(out_dir, quiz_bank.bank_name(input_path) + ".html")))
+    check_outputs(output_path for _, output_path in jobs)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    for input_path, output_path in jobs:
+        _, _, count, size, seconds = export_bank(input_path, output_path, key, passphrase)
+        lock = "（已加密）" if passphrase else ""
+        print(f"✅ {input_path} → {output_path}{lock}：{count} 題，{size / 1e6:.2f} MB，{seconds:.2f} 秒")
+    print(f"\n📊 共 {len(args.inputs)} 個題庫，{time.perf_counter() - started:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
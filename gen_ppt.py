@@ -1,10 +1,21 @@
-import json
+import argparse
+import hashlib
+import io
 import os
+import tempfile
+import time
+
+import pptx
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import MSO_ANCHOR, MSO_AUTO_SIZE
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE
+from PIL import Image
+
+import deck_cache
+import quiz_bank
+from batch_jobs import atomic_output, check_outputs, error_text, read_secret, run_jobs
 
 # --- 1. 配置與顏色定義 ---
 MAIN_TITLE = "✨ 腦光一閃"
@@ -14,25 +25,39 @@ COLOR_HIGHLIGHT = RGBColor(0x28, 0x7E, 0xF3)
 COLOR_WHITE = RGBColor(0xFF, 0xFF, 0xFF)
 COLOR_SUCCESS = RGBColor(0x00, 0xAA, 0x00)
 BUFFER_IMAGE_PATH = "your_buffer_image.png"
+SLIDE_WIDTH, SLIDE_HEIGHT = Inches(10), Inches(5.625)
+# 索引頁：第 2 頁起，每頁 6x6 = 36 題，題目多時自動分頁
+INDEX_FIRST_SLIDE = 2
+INDEX_PAGE_SIZE = 36
+# 精簡模式的緩衝頁圖片：縮到投影片播放時的解析度，不透明圖片轉為 JPEG
+COMPACT_IMAGE_SIZE = (1280, 720)
+COMPACT_JPEG_QUALITY = 80
+# 投影片快取目錄（只重新產生內容有變的投影片，見 deck_cache.py）
+PPT_CACHE_DIR = os.environ.get("QUIZ_PPT_CACHE_DIR", ".pptx_cache")
 
 GROUP_COLORS = [0x287EF3, 0x28B463, 0xD4AC0D, 0xCB4335, 0x884EA0, 0x17A589, 0xD35400]
 
 # --- 2. 輔助函數 ---
 
-def add_nav_back_button(slide):
+def add_nav_button(slide, text, target, left, top=Inches(4.7), width=Inches(2.4)):
     btn = slide.shapes.add_shape(
-        MSO_SHAPE.ROUNDED_RECTANGLE, Inches(7.3), Inches(4.7), Inches(2.4), Inches(0.7)
+        MSO_SHAPE.ROUNDED_RECTANGLE, left, top, width, Inches(0.7)
     )
     btn.fill.solid()
     btn.fill.fore_color.rgb = RGBColor(200, 200, 200)
     btn.line.color.rgb = COLOR_WHITE
     tf = btn.text_frame
-    tf.text = "🏠 回列表"
+    tf.text = text
     p = tf.paragraphs[0]
     p.font.size = Pt(28)
     p.font.bold = True
     p.font.color.rgb = RGBColor(50, 50, 50)
-    btn.click_action.hyperlink.address = "#2"
+    btn.click_action.hyperlink.address = f"#{target}"
+    return btn
+
+def add_nav_back_button(slide, target=INDEX_FIRST_SLIDE):
+    """ 回到題目所在的索引頁 """
+    return add_nav_button(slide, "🏠 回列表", target, Inches(7.3))
 
 def create_title_slide(prs, title_text, subtitle_text):
     slide = prs.slides.add_slide(prs.slide_layouts[0])
@@ -42,14 +67,27 @@ def create_title_slide(prs, title_text, subtitle_text):
     subtitle.text = subtitle_text
     return slide
 
-def add_grouped_index_to_slide(prs, questions, list_title):
-    """ 集合頁修正：確保方塊與文字的超連結皆正確指向 #{3 + i*3} """
+def index_page_count(question_count):
+    return max(1, -(-question_count // INDEX_PAGE_SIZE))
+
+def question_slide_number(i, question_count):
+    """ 第 i 題（0 起算）題目頁的頁碼：標題 1 頁 + 索引頁之後，每題 3 頁 """
+    return INDEX_FIRST_SLIDE + index_page_count(question_count) + (i * 3)
+
+def index_slide_number(i):
+    """ 第 i 題所在索引頁的頁碼 """
+    return INDEX_FIRST_SLIDE + i // INDEX_PAGE_SIZE
+
+def add_grouped_index_to_slide(prs, questions, list_title, page=0):
+    """ 第 page 頁索引（每頁 INDEX_PAGE_SIZE 題）；方塊與文字的超連結皆指向該題的題目頁 """
     slide = prs.slides.add_slide(prs.slide_layouts[6])
+    page_count = index_page_count(len(questions))
     title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.1), Inches(9), Inches(0.5))
-    title_box.text_frame.text = list_title
+    title_box.text_frame.text = list_title if page_count == 1 else f"{list_title}（{page + 1}/{page_count}）"
     title_box.text_frame.paragraphs[0].font.size = Pt(28)
     title_box.text_frame.paragraphs[0].font.bold = True
 
+    # 顏色以整份題庫的分組決定，各頁同一分組顏色一致
     unique_groups = list(dict.fromkeys([q.get('q_group', '一般') for q in questions]))
     group_color_map = {name: GROUP_COLORS[i % len(GROUP_COLORS)] for i, name in enumerate(unique_groups)}
 
@@ -58,13 +96,14 @@ def add_grouped_index_to_slide(prs, questions, list_title):
     margin_x, margin_y = Inches(0.12), Inches(0.1)
     start_x, start_y = Inches(0.3), Inches(0.7)
 
-    for i, q in enumerate(questions):
-        if i >= 36: break
-        row, col = i // cols, i % cols
+    first = page * INDEX_PAGE_SIZE
+    for i, q in enumerate(questions[first:first + INDEX_PAGE_SIZE], start=first):
+        slot = i - first
+        row, col = slot // cols, slot % cols
         left, top = start_x + (col * (width + margin_x)), start_y + (row * (height + margin_y))
         
         # 1. 建立目標索引
-        target_q_idx = 3 + (i * 3)
+        target_q_idx = question_slide_number(i, len(questions))
         target_link = f"#{target_q_idx}"
 
         # 2. 建立方塊並設定方塊點擊連結
@@ -88,12 +127,19 @@ def add_grouped_index_to_slide(prs, questions, list_title):
         run.font.color.rgb = COLOR_WHITE
         run.hyperlink.address = target_link # 🎯 文字連結修正
 
-def add_blank_buffer_slide(prs, image_path=None):
+    # 4. 多頁索引：上一頁 / 下一頁
+    if page > 0:
+        add_nav_button(slide, "◀ 上一頁", INDEX_FIRST_SLIDE + page - 1, Inches(0.3), Inches(4.85), Inches(1.9))
+    if page < page_count - 1:
+        add_nav_button(slide, "下一頁 ▶", INDEX_FIRST_SLIDE + page + 1, Inches(7.8), Inches(4.85), Inches(1.9))
+    return slide
+
+def add_blank_buffer_slide(prs, image_path=None, back_target=INDEX_FIRST_SLIDE):
     slide = prs.slides.add_slide(prs.slide_layouts[6])
     if image_path and os.path.exists(image_path):
         try: slide.shapes.add_picture(image_path, Inches(0), Inches(0), prs.slide_width, prs.slide_height)
         except: pass
-    add_nav_back_button(slide)
+    add_nav_back_button(slide, back_target)
     return slide
 
 def add_question_slide(prs, q_idx, q_data, target_ans_idx):
@@ -125,7 +171,7 @@ def add_question_slide(prs, q_idx, q_data, target_ans_idx):
     btn.click_action.hyperlink.address = f"#{target_ans_idx}"
     return slide
 
-def add_answer_slide(prs, q_idx, q_data):
+def add_answer_slide(prs, q_idx, q_data, back_target=INDEX_FIRST_SLIDE):
     slide = prs.slides.add_slide(prs.slide_layouts[6])
     ans_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1.2))
     ans_box.text_frame.text = f"正確答案：{q_data['answer']}"
@@ -143,38 +189,210 @@ def add_answer_slide(prs, q_idx, q_data):
     p_content.font.size = Pt(55)
     p_content.font.bold = True
     
-    add_nav_back_button(slide)
+    add_nav_back_button(slide, back_target)
     return slide
 
-# --- 3. 主流程 ---
+def compact_buffer_image(image_path, out_dir):
+    """ 精簡模式：緩衝頁圖片縮到投影片顯示大小並重新壓縮，回傳新圖片路徑。
+    所有緩衝頁本來就共用同一個圖片 part，縮小這一張即可大幅降低簡報大小 """
+    if not image_path or not os.path.exists(image_path):
+        return image_path
+    with open(image_path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha1(data + repr((COMPACT_IMAGE_SIZE, COMPACT_JPEG_QUALITY)).encode()).hexdigest()[:16]
 
-def generate_quiz_pptx_final(json_path, output_name="Quiz.pptx"):
-    if not os.path.exists(json_path): return
-    with open(json_path, "r", encoding="utf-8") as f:
-        questions = json.load(f)
+    with Image.open(io.BytesIO(data)) as img:
+        img.thumbnail(COMPACT_IMAGE_SIZE)
+        out = io.BytesIO()
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if has_alpha:
+            ext = "png"
+            img.save(out, "PNG", optimize=True)
+        else:
+            ext = "jpg"
+            img.convert("RGB").save(out, "JPEG", quality=COMPACT_JPEG_QUALITY, optimize=True, progressive=True)
+    if out.tell() >= len(data):
+        return image_path
+
+    os.makedirs(out_dir, exist_ok=True)
+    compact_path = os.path.join(out_dir, f"buffer_{digest}.{ext}")
+    if not os.path.exists(compact_path):
+        tmp_path = f"{compact_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(out.getvalue())
+        os.replace(tmp_path, compact_path)
+    return compact_path
 
+# --- 3. 主流程 ---
+
+def new_presentation():
     prs = Presentation()
-    prs.slide_width, prs.slide_height = Inches(10), Inches(5.625)
-    
-    create_title_slide(prs, MAIN_TITLE, "點擊方塊進入題目")
-    add_grouped_index_to_slide(prs, questions, LIST_PAGE_TITLE) 
+    prs.slide_width, prs.slide_height = SLIDE_WIDTH, SLIDE_HEIGHT
+    return prs
 
-    ans_start = 2 + (len(questions) * 3) + 1
+def render_slide(prs, kind, payload, links=None):
+    """ 依計畫中的（種類, 內容）產生一張投影片；內容必須決定投影片的全部外觀。
+    links 為 None 時（快取渲染）超連結使用佔位字串，組裝時才換成實際頁碼 """
+    def link(name):
+        return links[name] if links else deck_cache.link_placeholder(name)
 
-    for i, q in enumerate(questions):
-        # 題目頁索引：3, 6, 9...
-        target_ans = ans_start + (i * 3)
-        add_question_slide(prs, i, q, target_ans)
-        add_blank_buffer_slide(prs, BUFFER_IMAGE_PATH)
-        add_blank_buffer_slide(prs, BUFFER_IMAGE_PATH)
+    if kind == "title":
+        return create_title_slide(prs, *payload)
+    if kind == "index":
+        groups, page = payload
+        return add_grouped_index_to_slide(prs, [{"q_group": g} for g in groups], LIST_PAGE_TITLE, page)
+    if kind == "question":
+        q_idx, q = payload
+        return add_question_slide(prs, q_idx, q, link("ans"))
+    if kind == "answer":
+        q_idx, q = payload
+        return add_answer_slide(prs, q_idx, q, link("home"))
+    if kind == "buffer":
+        image_path, = payload
+        return add_blank_buffer_slide(prs, image_path, link("home"))
+    raise ValueError(f"未知的投影片種類：{kind}")
 
+def deck_plan(questions, buffer_image=BUFFER_IMAGE_PATH):
+    """ 整份簡報的投影片順序：[(種類, 內容, {佔位名稱: 頁碼})]
+    標題 → 索引頁（可能多頁）→ 每題（題目 + 2 緩衝）→ 每題（解答 + 2 緩衝） """
+    n = len(questions)
+    ans_start = question_slide_number(n, n)
+    groups = [q.get('q_group', '一般') for q in questions]
+    plan = [("title", [MAIN_TITLE, "點擊方塊進入題目"], None)]
+    plan.extend(("index", [groups, page], None) for page in range(index_page_count(n)))
     for i, q in enumerate(questions):
-        add_answer_slide(prs, i, q)
-        add_blank_buffer_slide(prs, BUFFER_IMAGE_PATH)
-        add_blank_buffer_slide(prs, BUFFER_IMAGE_PATH)
+        home = index_slide_number(i)
+        plan.append(("question", [i, q], {"ans": ans_start + (i * 3)}))
+        plan.extend([("buffer", [buffer_image], {"home": home})] * 2)
+    for i, q in enumerate(questions):
+        home = index_slide_number(i)
+        plan.append(("answer", [i, q], {"home": home}))
+        plan.extend([("buffer", [buffer_image], {"home": home})] * 2)
+    return plan
+
+def layout_signature():
+    """ 影響投影片外觀的一切：版面程式碼、python-pptx 版本、緩衝頁圖片、投影片大小 """
+    return deck_cache.layout_hash(
+        os.path.abspath(__file__), pptx.__version__, BUFFER_IMAGE_PATH,
+        (SLIDE_WIDTH, SLIDE_HEIGHT),
+    )
+
+def build_presentation(questions, output_name, cache_dir=PPT_CACHE_DIR, prune=True, compact=False):
+    """ 產生簡報並回傳統計 {"slides", "rendered", "reused", "bytes", "seconds"}；
+    cache_dir 為 None 時整份重新產生；compact 時緩衝頁使用縮小後的圖片 """
+    started = time.perf_counter()
+    buffer_image = BUFFER_IMAGE_PATH
+    if compact:
+        buffer_image = compact_buffer_image(BUFFER_IMAGE_PATH, cache_dir or tempfile.gettempdir())
+    plan = deck_plan(questions, buffer_image)
+
+    if cache_dir:
+        stats = deck_cache.build_deck(
+            output_name, plan, new_presentation, render_slide,
+            cache_dir, layout_signature(), prune=prune,
+        )
+    else:
+        prs = new_presentation()
+        for kind, payload, links in plan:
+            render_slide(prs, kind, payload, links)
+        with atomic_output(output_name) as f:
+            prs.save(f)
+        stats = {"slides": len(plan), "rendered": len(plan), "reused": 0}
+    stats["bytes"] = os.path.getsize(output_name)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+def generate_quiz_pptx_final(json_path, output_name="Quiz.pptx", cache_dir=PPT_CACHE_DIR, key=None, compact=False):
+    if not os.path.exists(json_path): return
+    questions = quiz_bank.read_records(json_path, key)
+    stats = build_presentation(questions, output_name, cache_dir, compact=compact)
+    print(
+        f"✅ 生成成功：{output_name}（{stats['slides']} 張，{stats['bytes'] / 1e6:.2f} MB；"
+        f"重新產生 {stats['rendered']}、沿用 {stats['reused']}，{stats['seconds']:.2f} 秒）"
+    )
+
+# --- 4. 批次產生（多個題庫平行處理） ---
+
+def build_deck_file(input_path, output_path, key, cache_dir, compact=False):
+    """ process pool 的工作單位：回傳 (輸入, 輸出, 題數, 統計)；清理快取留給主程序統一處理 """
+    started = time.perf_counter()
+    questions = quiz_bank.read_records(input_path, key)
+    stats = build_presentation(questions, output_path, cache_dir, prune=False, compact=compact)
+    stats["seconds"] = time.perf_counter() - started
+    return input_path, output_path, len(questions), stats
+
+def _report(jobs, outcomes, started):
+    """ 列出每份簡報的結果與失敗原因；回傳失敗的題庫數 """
+    results = []
+    total_slides = total_bytes = 0
+    for job, (result, error) in zip(jobs, outcomes):
+        if error is not None:
+            print(f"❌ {job[0]}：{error_text(error)}")
+            continue
+        results.append(result)
+        input_path, output_path, count, stats = result
+        total_slides += stats["slides"]
+        total_bytes += stats["bytes"]
+        print(
+            f"✅ {input_path} → {output_path}：{count} 題，{stats['slides']} 張，{stats['bytes'] / 1e6:.2f} MB"
+            f"（重新產生 {stats['rendered']}、沿用 {stats['reused']}），{stats['seconds']:.2f} 秒"
+        )
+    elapsed = time.perf_counter() - started
+    busy = sum(stats["seconds"] for *_, stats in results)
+    failed = len(jobs) - len(results)
+    print(
+        f"\n📊 成功 {len(results)} 份、失敗 {failed} 份簡報，{total_slides} 張投影片，{total_bytes / 1e6:.2f} MB，"
+        f"{elapsed:.2f} 秒（逐一產生合計 {busy:.2f} 秒）"
+    )
+    return failed
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="由題庫產生互動簡報（可一次處理多個題庫）")
+    parser.add_argument("inputs", nargs="*",
+                        help="題庫檔案：明文 .json 或加密 .enc（預設 questions_data.json）")
+    parser.add_argument("-o", "--output", help="輸出檔名（只有一個題庫時使用）")
+    parser.add_argument("--out-dir", help="批次輸出目錄（預設與題庫相同，檔名為 <題庫>.pptx）")
+    parser.add_argument("--key", help=".enc 題庫的金鑰（預設為環境變數 QUIZ_SECRET_KEY）")
+    parser.add_argument("--key-file", help="從檔案讀取金鑰")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="平行處理的 process 數")
+    parser.add_argument("--cache-dir", default=PPT_CACHE_DIR, help="投影片快取目錄")
+    parser.add_argument("--no-cache", action="store_true", help="不使用快取，整份重新產生")
+    parser.add_argument("--compact", action="store_true",
+                        help="精簡輸出：緩衝頁圖片縮到投影片解析度並重新壓縮")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    key = read_secret(args.key, args.key_file, "QUIZ_SECRET_KEY")
+    cache_dir = None if args.no_cache else args.cache_dir
+    inputs = args.inputs or ["questions_data.json"]
+    if args.output and len(inputs) > 1:
+        raise SystemExit("❌ 多個題庫時請用 --out-dir 指定輸出目錄")
+
+    jobs = []
+    for input_path in inputs:
+        if not os.path.exists(input_path):
+            raise SystemExit(f"❌ 找不到題庫：{input_path}")
+        if input_path.endswith(".enc") and not key:
+            raise SystemExit(f"❌ {input_path} 需要 --key / --key-file 或環境變數 QUIZ_SECRET_KEY")
+        if args.output:
+            output_path = args.output
+        elif not args.inputs:
+            output_path = f"{MAIN_TITLE}_互動簡報.pptx"
+        else:
+            out_dir = args.out_dir or os.path.dirname(input_path)
+            output_path = os.path.join(out_dir, os.path.splitext(os.path.basename(input_path))[0] + ".pptx")
+        jobs.append((input_path, output_path, key, cache_dir, args.compact))
+    check_outputs(job[1] for job in jobs)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
 
-    prs.save(output_name)
-    print(f"✅ 生成成功：{output_name}")
+    started = time.perf_counter()
+    outcomes = run_jobs(build_deck_file, jobs, min(args.workers, len(jobs)))
+    if cache_dir:
+        deck_cache.prune_unused(cache_dir)
+    if _report(jobs, outcomes, started):
+        raise SystemExit(1)
 
 if __name__ == "__main__":
-    generate_quiz_pptx_final("questions_data.json", f"{MAIN_TITLE}_互動簡報.pptx")
\ No newline at end of file
+    main()
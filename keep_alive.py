@@ -1,11 +1,250 @@
-import requests, time
+# keep_alive.py
+# =====================================================
+# 💓 多站點保持喚醒 + 延遲統計
+# =====================================================
+# 以 asyncio 同時監控多個部署，每個站點各自排程（含隨機抖動）、逾時與失敗退避，
+# 在記憶體中保留最近的延遲紀錄，定期輸出 p50/p95/p99 與可用率，也可寫成 JSON。
+# 用法：
+#   python keep_alive.py                                   # 同以往：每 10 分鐘喚醒 Render
+#   python keep_alive.py https://a.onrender.com/healthz https://b.onrender.com/healthz
+#   python keep_alive.py --config targets.json --stats-file keep_alive_stats.json
+#   python keep_alive.py http://127.0.0.1:8501/healthz --interval 5 --rounds 3   # 本機測試
+# targets.json：[{"url": "...", "interval": 600, "timeout": 10}, ...]
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-RENDER_URL = "https://bible-quiz.onrender.com/?ping=1"
+import requests
 
-while True:
+from percentiles import percentile
+
+RENDER_URL = "https://bible-quiz.onrender.com/healthz?warm=1"
+DEFAULT_INTERVAL = 600  # 每10分鐘
+DEFAULT_TIMEOUT = 10
+LATENCY_WINDOW = 200
+
+
+def _now():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def is_up(status):
+    """ 只有 2xx / 3xx 算成功；404（網址打錯）、401 / 403（需要登入）都沒有真的喚醒 app """
+    return status is not None and 200 <= status < 400
+
+
+class TargetStats:
+    """ 單一站點的統計：最近 LATENCY_WINDOW 次成功請求的延遲與累計成功 / 失敗次數 """
+
+    def __init__(self, url):
+        self.url = url
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.ok = 0
+        self.failed = 0
+        self.consecutive_failures = 0
+        self.last_status = None
+        self.last_error = None
+        self.last_checked = None
+        self.max_latency = 0.0
+
+    def record(self, status, latency, error=None):
+        self.last_checked = _now()
+        self.last_status = status
+        if error is None and not is_up(status):
+            error = f"HTTP {status}"
+        self.last_error = error
+        if error is None:
+            self.ok += 1
+            self.consecutive_failures = 0
+            self.latencies.append(latency)
+            self.max_latency = max(self.max_latency, latency)
+        else:
+            self.failed += 1
+            self.consecutive_failures += 1
+
+    def summary(self):
+        values = sorted(self.latencies)
+        total = self.ok + self.failed
+
+        def ms(v):
+            return round(v * 1000, 1) if v is not None else None
+
+        return {
+            "url": self.url,
+            "checks": total,
+            "uptime_pct": round(self.ok / total * 100, 2) if total else None,
+            "p50_ms": ms(percentile(values, 50)),
+            "p95_ms": ms(percentile(values, 95)),
+            "p99_ms": ms(percentile(values, 99)),
+            # 睡眠中的實例被喚醒時延遲會特別高，保留最大值觀察冷啟動
+            "max_ms": ms(self.max_latency) if self.ok else None,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "last_checked": self.last_checked,
+        }
+
+
+# =====================================================
+# 🧵 發送請求：專用執行緒池，每個執行緒一個 requests.Session
+# =====================================================
+# requests 是阻塞式的；若用 asyncio.to_thread（預設執行緒池只有 min(32, CPU + 4) 條），
+# 單核心主機上最多 5 個請求同時進行，逾時的站點會拖慢其他站點的排程。
+# 這裡每個站點一條執行緒，requests.Session 不保證可跨執行緒共用，所以每條執行緒各自建立。
+_local = threading.local()
+
+
+def _init_worker(sessions, lock):
+    session = requests.Session()
+    _local.session = session
+    with lock:
+        sessions.append(session)
+
+
+def _ping(url, timeout):
+    started = time.perf_counter()
+    try:
+        r = _local.session.get(url, timeout=timeout)
+        return r.status_code, time.perf_counter() - started, None
+    except requests.RequestException as e:
+        return None, time.perf_counter() - started, str(e)
+
+
+async def monitor(executor, target, stats, jitter, backoff_base, rounds, quiet):
+    """ 單一站點的排程迴圈；失敗時以指數退避提早重試，最長不超過原本的間隔 """
+    interval, timeout = target["interval"], target["timeout"]
+    # 起始時間隨機錯開，多個站點不會同時發出請求
+    await asyncio.sleep(random.uniform(0, jitter * interval))
+    loop = asyncio.get_running_loop()
+    done = 0
+    while rounds is None or done < rounds:
+        status, latency, error = await loop.run_in_executor(executor, _ping, target["url"], timeout)
+        stats.record(status, latency, error)
+        done += 1
+        if not quiet:
+            if stats.consecutive_failures == 0:
+                print(f"[{_now()}] PING {status} {latency * 1000:.0f}ms {target['url']}")
+            else:
+                print(f"[{_now()}] Ping failed: {target['url']} {stats.last_error}")
+
+        if rounds is not None and done >= rounds:
+            break
+        if stats.consecutive_failures:
+            delay = min(interval, backoff_base * 2 ** (stats.consecutive_failures - 1))
+        else:
+            delay = interval
+        await asyncio.sleep(delay * random.uniform(1 - jitter, 1 + jitter))
+
+
+def snapshot(all_stats):
+    return {"generated_at": _now(), "targets": [s.summary() for s in all_stats]}
+
+
+def write_stats(all_stats, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(all_stats), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def print_summary(all_stats):
+    def fmt(v, unit):
+        return "-" if v is None else f"{v}{unit}"
+
+    print(f"\n📊 [{_now()}] 延遲統計")
+    for s in all_stats:
+        d = s.summary()
+        print(f"  {d['url']}：可用率 {fmt(d['uptime_pct'], '%')}（{d['checks']} 次），"
+              f"p50 {fmt(d['p50_ms'], 'ms')} / p95 {fmt(d['p95_ms'], 'ms')} / "
+              f"p99 {fmt(d['p99_ms'], 'ms')} / max {fmt(d['max_ms'], 'ms')}")
+
+
+async def report_loop(all_stats, every, stats_file):
+    while True:
+        await asyncio.sleep(every)
+        print_summary(all_stats)
+        if stats_file:
+            write_stats(all_stats, stats_file)
+
+
+async def run(targets, jitter=0.1, backoff_base=15, rounds=None, summary_every=3600,
+              stats_file=None, quiet=False):
+    """ 同時監控所有站點；rounds 指定每個站點要 ping 幾次（None 表示一直執行） """
+    all_stats = [TargetStats(t["url"]) for t in targets]
+    sessions, lock = [], threading.Lock()
+    executor = ThreadPoolExecutor(
+        max_workers=len(targets), thread_name_prefix="keep-alive",
+        initializer=_init_worker, initargs=(sessions, lock),
+    )
+    reporter = asyncio.create_task(report_loop(all_stats, summary_every, stats_file))
+    try:
+        await asyncio.gather(*(
+            monitor(executor, t, s, jitter, backoff_base, rounds, quiet)
+            for t, s in zip(targets, all_stats)
+        ))
+    finally:
+        reporter.cancel()
+        # 不等待逾時中的請求（Ctrl+C 時立即結束）
+        executor.shutdown(wait=False, cancel_futures=True)
+        for session in sessions:
+            session.close()
+        print_summary(all_stats)
+        if stats_file:
+            write_stats(all_stats, stats_file)
+    return snapshot(all_stats)
+
+
+def load_targets(args):
+    targets = []
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                targets.append({
+                    "url": item["url"],
+                    "interval": item.get("interval", args.interval),
+                    "timeout": item.get("timeout", args.timeout),
+                })
+    urls = args.urls or ([] if targets else os.environ.get("KEEP_ALIVE_URLS", RENDER_URL).split(","))
+    for url in urls:
+        targets.append({"url": url.strip(), "interval": args.interval, "timeout": args.timeout})
+    return targets
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="定期喚醒多個部署並統計延遲")
+    parser.add_argument("urls", nargs="*", help="要 ping 的網址（預設為 KEEP_ALIVE_URLS 或 Render 網址）")
+    parser.add_argument("--config", help="站點設定 JSON：[{url, interval, timeout}, ...]")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="每個站點的 ping 間隔（秒）")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="單次請求逾時（秒）")
+    parser.add_argument("--jitter", type=float, default=0.1, help="排程隨機抖動比例")
+    parser.add_argument("--backoff", type=float, default=15, help="失敗後第一次重試的等待秒數，之後加倍")
+    parser.add_argument("--rounds", type=int, help="每個站點 ping 幾次後結束（預設一直執行）")
+    parser.add_argument("--summary-every", type=float, default=3600, help="每隔幾秒輸出一次統計")
+    parser.add_argument("--stats-file", help="統計結果 JSON 檔案路徑")
+    parser.add_argument("--quiet", action="store_true", help="不輸出每一次 ping 的結果")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
     try:
-        r = requests.get(RENDER_URL, timeout=10)
-        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] PING {r.status_code}")
-    except Exception as e:
-        print("Ping failed:", e)
-    time.sleep(600)  # 每10分鐘
+        asyncio.run(run(
+            load_targets(args),
+            jitter=args.jitter,
+            backoff_base=args.backoff,
+            rounds=args.rounds,
+            summary_every=args.summary_every,
+            stats_file=args.stats_file,
+            quiet=args.quiet,
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# live_session.py
+# =====================================================
+# 📡 主持人投影模式（整個程序共用的狀態）
+# =====================================================
+# 主持人開一個房間（代碼），目前題目與是否公布答案都放在這裡；
+# 觀眾以 ?live=代碼 加入，只跟著主持人顯示，不需要登入。
+# 每次狀態改變 version 加一，觀眾頁面只比對 version（O(1)），
+# 有變化才重跑整個 app.py，狀態不變時不會重送任何題目內容。
+import os
+import secrets
+import threading
+import time
+
+# 房間閒置多久後移除（秒）
+ROOM_TTL = float(os.environ.get("QUIZ_LIVE_ROOM_TTL", str(12 * 3600)))
+# 觀眾頁面檢查 version 的間隔（秒）
+POLL_SECONDS = float(os.environ.get("QUIZ_LIVE_POLL_SECONDS", "1.0"))
+# 房間代碼不含容易混淆的字元（0/O、1/I/L）
+CODE_ALPHABET = "ABCDEFGHJKMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 4
+
+
+class LiveRoom:
+    """ 一個房間的狀態；欄位只在 _LOCK 內修改，讀取時拿到的是 snapshot() 的複本 """
+
+    __slots__ = ("code", "host", "bank", "current_q", "show_answer", "version", "updated_at")
+
+    def __init__(self, code, host, bank):
+        self.code = code
+        self.host = host
+        self.bank = bank
+        self.current_q = None
+        self.show_answer = False
+        self.version = 0
+        self.updated_at = time.time()
+
+    def snapshot(self):
+        return {
+            "code": self.code,
+            "bank": self.bank,
+            "current_q": self.current_q,
+            "show_answer": self.show_answer,
+            "version": self.version,
+        }
+
+
+_ROOMS = {}
+_LOCK = threading.Lock()
+
+
+def _prune(now):
+    for code in [code for code, room in _ROOMS.items() if now - room.updated_at > ROOM_TTL]:
+        del _ROOMS[code]
+
+
+def normalize_code(code):
+    return (code or "").strip().upper()
+
+
+def open_room(host, bank):
+    """ 建立新房間，回傳房間代碼；host 為主持人的識別（progress_id） """
+    now = time.time()
+    with _LOCK:
+        _prune(now)
+        code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        while code in _ROOMS:
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        _ROOMS[code] = LiveRoom(code, host, bank)
+    return code
+
+
+def close_room(code, host):
+    with _LOCK:
+        room = _ROOMS.get(normalize_code(code))
+        if room is not None and room.host == host:
+            del _ROOMS[room.code]
+
+
+def publish(code, host, bank, current_q, show_answer):
+    """ 主持人更新狀態；內容相同時不會增加 version，觀眾不會重跑。回傳目前 version """
+    with _LOCK:
+        room = _ROOMS.get(normalize_code(code))
+        if room is None or room.host != host:
+            return None
+        if (room.bank, room.current_q, room.show_answer) != (bank, current_q, show_answer):
+            room.bank = bank
+            room.current_q = current_q
+            room.show_answer = show_answer
+            room.version += 1
+        room.updated_at = time.time()
+        return room.version
+
+
+def get_room(code):
+    """ 房間狀態的複本；房間不存在回傳 None """
+    with _LOCK:
+        room = _ROOMS.get(normalize_code(code))
+        return room.snapshot() if room is not None else None
+
+
+def version(code):
+    """ 觀眾頁面定期呼叫：只回傳 version（房間已關閉回傳 None） """
+    room = _ROOMS.get(normalize_code(code))
+    return room.version if room is not None else None
+
+
+def room_count():
+    with _LOCK:
+        return len(_ROOMS)
+
+
+def find_room(host):
+    """ 主持人目前開著的房間代碼（重新登入時接回房間用）；沒有則回傳 None """
+    with _LOCK:
+        return next((code for code, room in _ROOMS.items() if room.host == host), None)
@@ -0,0 +1,311 @@
+# load_test.py
+# =====================================================
+# 👥 活動現場壓力測試
+# =====================================================
+# 模擬一整個場地的手機同時登入、點題目、公布答案：
+# 在本機啟動 app（serve.py），以 Streamlit 的 websocket 協定（protobuf BackMsg /
+# ForwardMsg）建立 N 個模擬瀏覽器 session，流程為 登入 → 首頁 → 題目 → 解答 → 回首頁，
+# 回報每種操作的 p50/p95/p99 延遲、整體吞吐量與伺服器 RSS。
+# 用法：
+#   python load_test.py                                  # 10 / 50 / 100 個 session
+#   python load_test.py --sessions 20 100 200 --questions 5 --bank-size 500
+#   python load_test.py --url ws://127.0.0.1:8501 --bank questions --user xxx --password yyy   # 測既有伺服器
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+import bench_app
+from percentiles import percentile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STREAM_PATH = "/_stcore/stream"
+DEFAULT_SESSIONS = (10, 50, 100)
+# script_finished 的狀態：FINISHED_EARLY_FOR_RERUN 表示緊接著還有一次 rerun（例如 goto()）
+FINISHED_EARLY_FOR_RERUN = 2
+
+
+# =====================================================
+# 🌐 模擬瀏覽器 session
+# =====================================================
+class SimulatedBrowser:
+    """ 一個 websocket 連線 = 一個瀏覽器分頁；記錄畫面上的 widget id 以便送出操作 """
+
+    def __init__(self, base_url, query_string):
+        self.base_url = base_url
+        self.query_string = query_string
+        self.conn = None
+        # widget 標籤 → (widget id, fragment id)；題目方格元件以 "quiz_grid" 為鍵
+        self.widgets = {}
+        self.bytes_received = 0
+
+    async def connect(self):
+        self.conn = await websocket_connect(self.base_url + STREAM_PATH, subprotocols=["streamlit"])
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+    async def rerun(self, widgets=(), fragment_id=""):
+        """ 送出一次 rerun（可附 widget 狀態），等到 script 跑完才回傳 """
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.query_string = self.query_string
+        state.fragment_id = fragment_id
+        for widget in widgets:
+            state.widget_states.widgets.append(widget)
+        await self.conn.write_message(msg.SerializeToString(), binary=True)
+
+        while True:
+            payload = await self.conn.read_message()
+            if payload is None:
+                raise ConnectionError("websocket 已關閉")
+            self.bytes_received += len(payload)
+            fwd = ForwardMsg()
+            fwd.ParseFromString(payload)
+            kind = fwd.WhichOneof("type")
+            if kind == "delta":
+                self._track_widget(fwd.delta)
+            elif kind == "script_finished" and fwd.script_finished != FINISHED_EARLY_FOR_RERUN:
+                return
+
+    def _track_widget(self, delta):
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "component_instance":
+            self.widgets[element.component_instance.component_name.split(".")[-1]] = (
+                element.component_instance.id, delta.fragment_id
+            )
+        elif kind in ("button", "text_input", "slider", "selectbox"):
+            widget = getattr(element, kind)
+            self.widgets[widget.label] = (widget.id, delta.fragment_id)
+
+    def state(self, label, **value):
+        """ 產生 WidgetState；value 例如 trigger_value=True、string_value="..." """
+        widget_id, fragment_id = self.widgets[label]
+        msg = BackMsg()
+        widget = msg.rerun_script.widget_states.widgets.add()
+        widget.id = widget_id
+        for field, v in value.items():
+            setattr(widget, field, v)
+        return widget, fragment_id
+
+    async def click(self, label):
+        widget, fragment_id = self.state(label, trigger_value=True)
+        await self.rerun([widget], fragment_id)
+
+
+async def simulate_user(base_url, query_string, user, password, bank_size, questions, latencies):
+    """ 一位使用者：連線 → 登入 → 開題 → 解答 → 公布 → 回首頁（重複 questions 次） """
+
+    async def timed(step, coro):
+        started = time.perf_counter()
+        await coro
+        latencies.setdefault(step, []).append(time.perf_counter() - started)
+
+    browser = SimulatedBrowser(base_url, query_string)
+    try:
+        await timed("connect", browser.connect())
+        await timed("first_page", browser.rerun())
+
+        user_state, _ = browser.state("帳號", string_value=user)
+        pass_state, _ = browser.state("密碼", string_value=password)
+        login_state, _ = browser.state("登入", trigger_value=True)
+        await timed("login", browser.rerun([user_state, pass_state, login_state]))
+
+        for _ in range(questions):
+            pick = {"index": random.randrange(bank_size), "nonce": random.random()}
+            grid_state, _ = browser.state("quiz_grid", json_value=json.dumps(pick))
+            await timed("open_question", browser.rerun([grid_state]))
+            await timed("reveal_dialog", browser.click("📜 解答"))
+            await timed("reveal", browser.click("✅ 是"))
+            await timed("back_home", browser.click("🏠 回首頁"))
+        return browser.bytes_received
+    finally:
+        browser.close()
+
+
+# =====================================================
+# 🖥️ 本機伺服器與 RSS
+# =====================================================
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def read_rss_kib(pid):
+    """ 從 /proc 讀取 RSS（Linux）；其他平台回傳 None """
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def start_server(bank_size, user, password):
+    workdir = tempfile.mkdtemp(prefix="bible_quiz_load_")
+    bench_app.write_banks(workdir, [bank_size], "json", None)
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        HOST="127.0.0.1",
+        QUIZ_BANK_DIR=workdir,
+        QUIZ_PROGRESS_DB=os.path.join(workdir, "progress.db"),
+        BIBLE_QUIZ_USER=user,
+        BIBLE_QUIZ_PASS=password,
+        STREAMLIT_SERVER_HEADLESS="true",
+        STREAMLIT_BROWSER_GATHER_USAGE_STATS="false",
+    )
+    env.pop("QUIZ_SECRET_KEY", None)
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "serve.py"), os.path.join(ROOT, "app.py")],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz?warm=1", timeout=1).read()
+            return proc, f"ws://127.0.0.1:{port}", f"bench_{bank_size}"
+        except OSError:
+            time.sleep(0.3)
+    proc.kill()
+    raise RuntimeError("伺服器啟動逾時")
+
+
+async def sample_rss(pid, samples):
+    while True:
+        rss = read_rss_kib(pid)
+        if rss is not None:
+            samples.append(rss)
+        await asyncio.sleep(0.2)
+
+
+# =====================================================
+# 📊 執行與報告
+# =====================================================
+async def run_level(base_url, bank, n, args, pid):
+    latencies = {}
+    rss_samples = []
+    sampler = asyncio.create_task(sample_rss(pid, rss_samples)) if pid else None
+
+    async def one(i):
+        # 在 ramp 秒內錯開進場，模擬大家在同一分鐘內陸續開啟網頁
+        await asyncio.sleep(random.uniform(0, args.ramp))
+        query = f"bank={bank}&sid=load{n}_{i}"
+        return await simulate_user(base_url, query, args.user, args.password,
+                                   args.bank_size, args.questions, latencies)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(n)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    if sampler:
+        sampler.cancel()
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    all_latencies = sorted(v for values in latencies.values() for v in values)
+    interactions = sum(len(v) for k, v in latencies.items() if k != "connect")
+
+    def ms(v):
+        return round(v * 1000, 1) if v is not None else None
+
+    steps = {}
+    for step, values in latencies.items():
+        values.sort()
+        steps[step] = {
+            "count": len(values),
+            "p50_ms": ms(percentile(values, 50)),
+            "p95_ms": ms(percentile(values, 95)),
+            "p99_ms": ms(percentile(values, 99)),
+        }
+    return {
+        "sessions": n,
+        "errors": len(errors),
+        "first_error": repr(errors[0]) if errors else None,
+        "seconds": round(elapsed, 3),
+        "interactions": interactions,
+        "throughput_per_s": round(interactions / elapsed, 2) if elapsed else None,
+        "p50_ms": ms(percentile(all_latencies, 50)),
+        "p95_ms": ms(percentile(all_latencies, 95)),
+        "p99_ms": ms(percentile(all_latencies, 99)),
+        "rss_max_mib": round(max(rss_samples) / 1024, 1) if rss_samples else None,
+        "rss_end_mib": round(rss_samples[-1] / 1024, 1) if rss_samples else None,
+        "bytes_received": sum(r for r in results if isinstance(r, int)),
+        "steps": steps,
+    }
+
+
+def print_level(r):
+    print(f"\n👥 {r['sessions']} 個 session：{r['interactions']} 次操作 / {r['seconds']} 秒 "
+          f"= {r['throughput_per_s']} 次/秒，錯誤 {r['errors']}")
+    print(f"   延遲 p50 {r['p50_ms']} ms / p95 {r['p95_ms']} ms / p99 {r['p99_ms']} ms，"
+          f"RSS 最高 {r['rss_max_mib']} MiB，收到 {r['bytes_received'] / 1e6:.2f} MB")
+    for step, s in r["steps"].items():
+        print(f"   - {step:<14} {s['count']:>5} 次  p50 {s['p50_ms']:>8} ms  "
+              f"p95 {s['p95_ms']:>8} ms  p99 {s['p99_ms']:>8} ms")
+    if r["first_error"]:
+        print(f"   ⚠️ 第一個錯誤：{r['first_error']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="模擬多個瀏覽器 session 同時操作 app")
+    parser.add_argument("--sessions", type=int, nargs="+", default=list(DEFAULT_SESSIONS), help="同時的 session 數")
+    parser.add_argument("--questions", type=int, default=3, help="每位使用者開幾題")
+    parser.add_argument("--bank-size", type=int, default=100, help="合成題庫題數（或既有題庫的題數）")
+    parser.add_argument("--ramp", type=float, default=5, help="所有 session 在幾秒內陸續進場")
+    parser.add_argument("--url", help="既有伺服器的 ws:// 網址；不指定則在本機啟動 serve.py")
+    parser.add_argument("--pid", type=int, help="既有伺服器的 PID（用來讀 RSS）")
+    parser.add_argument("--bank", help="既有伺服器上的題庫名稱")
+    parser.add_argument("--user", default="load", help="登入帳號")
+    parser.add_argument("--password", default="load", help="登入密碼")
+    parser.add_argument("--output", help="結果 JSON 檔案路徑")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    proc = None
+    if args.url:
+        base_url, bank, pid = args.url.rstrip("/"), args.bank or "questions", args.pid
+    else:
+        proc, base_url, bank = start_server(args.bank_size, args.user, args.password)
+        pid = proc.pid
+        print(f"🚀 已在本機啟動 app：{base_url}（PID {pid}，題庫 {bank}）")
+
+    levels = []
+    try:
+        for n in args.sessions:
+            result = asyncio.run(run_level(base_url, bank, n, args, pid))
+            print_level(result)
+            levels.append(result)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.strftime("%Y-%m-%d %H:%M:%S"), "levels": levels},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
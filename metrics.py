@@ -0,0 +1,193 @@
+# metrics.py
+# =====================================================
+# 📈 rerun 效能指標（選用，QUIZ_METRICS=1 才啟用）
+# =====================================================
+# 整個程序共用一份統計：每個階段（題庫載入、樣式、題目方格…）的耗時、
+# 各頁面 / 各 session 的 rerun 次數、活躍 session 數與題庫快取命中率。
+# app.py 的管理頁與 serve.py 的 /metrics（Prometheus 文字格式）都從這裡讀取。
+# 未啟用時 phase() 回傳共用的空 context manager，rerun 路徑上幾乎沒有額外成本。
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import quiz_bank
+from percentiles import percentile
+
+ENABLED = os.environ.get("QUIZ_METRICS", "").lower() in ("1", "true", "yes")
+# 管理頁只開放給這些帳號（逗號分隔）
+ADMIN_USERS = frozenset(u.strip() for u in os.environ.get("QUIZ_ADMIN_USERS", "").split(",") if u.strip())
+# 多久內有 rerun 的 session 算「活躍」
+ACTIVE_WINDOW = float(os.environ.get("QUIZ_METRICS_ACTIVE_SECONDS", "300"))
+SAMPLE_WINDOW = 500
+MAX_TRACKED_SESSIONS = 5000
+QUANTILES = (0.5, 0.95, 0.99)
+
+STARTED_AT = time.time()
+_LOCK = threading.Lock()
+_NOOP = nullcontext()
+# 階段名稱 → [次數, 總秒數, 最大秒數, 最近 SAMPLE_WINDOW 次的秒數]
+_PHASES = {}
+# 頁面 → rerun 次數
+_PAGE_RERUNS = {}
+# session id → [最後 rerun 時間, rerun 次數]
+_SESSIONS = {}
+_SESSIONS_SEEN = 0
+
+
+def is_admin(username):
+    """ 是否為管理者帳號（QUIZ_ADMIN_USERS）；各管理頁另外檢查功能是否啟用，見 app.py 的 can_open """
+    return username in ADMIN_USERS
+
+
+# =====================================================
+# ⏱️ 記錄
+# =====================================================
+def record_phase(name, seconds):
+    with _LOCK:
+        entry = _PHASES.get(name)
+        if entry is None:
+            entry = _PHASES[name] = [0, 0.0, 0.0, deque(maxlen=SAMPLE_WINDOW)]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        entry[3].append(seconds)
+
+
+@contextmanager
+def _timed(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        # st.stop() / st.rerun() 以例外中斷也照樣計時
+        record_phase(name, time.perf_counter() - started)
+
+
+def phase(name):
+    """ with metrics.phase("bank_load"): ... ；未啟用時不做任何事 """
+    return _timed(name) if ENABLED else _NOOP
+
+
+def record_rerun(page, session_id):
+    global _SESSIONS_SEEN
+    if not ENABLED:
+        return
+    now = time.time()
+    with _LOCK:
+        _PAGE_RERUNS[page] = _PAGE_RERUNS.get(page, 0) + 1
+        entry = _SESSIONS.get(session_id)
+        if entry is None:
+            _SESSIONS_SEEN += 1
+            if len(_SESSIONS) >= MAX_TRACKED_SESSIONS:
+                _prune_sessions(now)
+            _SESSIONS[session_id] = [now, 1]
+        else:
+            entry[0] = now
+            entry[1] += 1
+
+
+def _prune_sessions(now):
+    for sid in [sid for sid, (last, _) in _SESSIONS.items() if now - last > ACTIVE_WINDOW]:
+        del _SESSIONS[sid]
+
+
+def reset():
+    global _SESSIONS_SEEN
+    with _LOCK:
+        _PHASES.clear()
+        _PAGE_RERUNS.clear()
+        _SESSIONS.clear()
+        _SESSIONS_SEEN = 0
+
+
+# =====================================================
+# 📊 讀取
+# =====================================================
+def snapshot():
+    """ 目前的統計（給管理頁顯示）；秒數皆為浮點數 """
+    now = time.time()
+    with _LOCK:
+        _prune_sessions(now)
+        phases = {}
+        for name, (count, total, longest, samples) in _PHASES.items():
+            values = sorted(samples)
+            phases[name] = {
+                "count": count,
+                "total_seconds": total,
+                "avg_seconds": total / count if count else None,
+                "max_seconds": longest,
+                "quantiles": {q: percentile(values, q * 100) for q in QUANTILES},
+            }
+        sessions = sorted(
+            ({"session": sid, "reruns": n, "idle_seconds": now - last} for sid, (last, n) in _SESSIONS.items()),
+            key=lambda s: -s["reruns"],
+        )
+        page_reruns = dict(_PAGE_RERUNS)
+        seen = _SESSIONS_SEEN
+    return {
+        "enabled": ENABLED,
+        "uptime_seconds": now - STARTED_AT,
+        "phases": phases,
+        "page_reruns": page_reruns,
+        "active_sessions": len(sessions),
+        "sessions_seen": seen,
+        "sessions": sessions,
+        "bank_stats": quiz_bank.bank_stats(),
+        "reload_errors": quiz_bank.reload_errors(),
+    }
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(snap=None):
+    """ Prometheus 文字格式（text/plain; version=0.0.4） """
+    snap = snap or snapshot()
+    bank = snap["bank_stats"]
+    lines = [
+        "# HELP quiz_uptime_seconds Seconds since the metrics module was loaded.",
+        "# TYPE quiz_uptime_seconds gauge",
+        f"quiz_uptime_seconds {snap['uptime_seconds']:.3f}",
+        "# HELP quiz_phase_seconds Time spent in each phase of a rerun.",
+        "# TYPE quiz_phase_seconds summary",
+    ]
+    for name, p in snap["phases"].items():
+        for q, v in p["quantiles"].items():
+            lines.append(f'quiz_phase_seconds{{phase="{_label(name)}",quantile="{q}"}} {v:.6f}')
+        lines.append(f'quiz_phase_seconds_sum{{phase="{_label(name)}"}} {p["total_seconds"]:.6f}')
+        lines.append(f'quiz_phase_seconds_count{{phase="{_label(name)}"}} {p["count"]}')
+    lines += [
+        "# HELP quiz_reruns_total Script reruns per page.",
+        "# TYPE quiz_reruns_total counter",
+    ]
+    lines += [f'quiz_reruns_total{{page="{_label(page)}"}} {n}' for page, n in snap["page_reruns"].items()]
+    lines += [
+        "# HELP quiz_active_sessions Sessions with a rerun in the active window.",
+        "# TYPE quiz_active_sessions gauge",
+        f"quiz_active_sessions {snap['active_sessions']}",
+        "# HELP quiz_sessions_seen_total Sessions seen since start.",
+        "# TYPE quiz_sessions_seen_total counter",
+        f"quiz_sessions_seen_total {snap['sessions_seen']}",
+        "# HELP quiz_bank_cache_loads_total Question banks decrypted / parsed.",
+        "# TYPE quiz_bank_cache_loads_total counter",
+        f"quiz_bank_cache_loads_total {bank['loads']}",
+        "# HELP quiz_bank_cache_hits_total Bank lookups served from the cache.",
+        "# TYPE quiz_bank_cache_hits_total counter",
+        f"quiz_bank_cache_hits_total {bank['hits']}",
+        "# HELP quiz_bank_cache_evictions_total Banks evicted from the cache.",
+        "# TYPE quiz_bank_cache_evictions_total counter",
+        f"quiz_bank_cache_evictions_total {bank['evictions']}",
+        "# HELP quiz_bank_load_seconds_total Time spent loading banks.",
+        "# TYPE quiz_bank_load_seconds_total counter",
+        f"quiz_bank_load_seconds_total {bank['load_seconds']:.6f}",
+        "# HELP quiz_bank_cached Banks currently held in the cache.",
+        "# TYPE quiz_bank_cached gauge",
+        f"quiz_bank_cached {bank['cached_banks']}",
+        "# HELP quiz_bank_reload_errors Banks whose updated file failed to load (old version still served).",
+        "# TYPE quiz_bank_reload_errors gauge",
+        f"quiz_bank_reload_errors {len(snap['reload_errors'])}",
+    ]
+    return "\n".join(lines) + "\n"
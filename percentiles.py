@@ -0,0 +1,14 @@
+# percentiles.py
+# =====================================================
+# 📐 百分位數（metrics、keep_alive、load_test、bench_app 共用）
+# =====================================================
+# nearest-rank：回傳排序後第 ceil-ish(pct% × n) 筆的實際樣本值，不做內插，
+# 樣本少時 p99 就是最大值，各工具的數字可以直接互相比較。
+
+
+def percentile(sorted_values, pct):
+    """ nearest-rank 百分位數；sorted_values 需已排序，pct 為 0–100，沒有樣本時回傳 None """
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
@@ -0,0 +1,112 @@
+# progress_store.py
+# =====================================================
+# 💾 作答紀錄儲存（伺服器端 SQLite，批次延遲寫入）
+# =====================================================
+# 作答紀錄以 bitset（第 i 題對應第 i 個 bit）存進 SQLite。
+# save_progress 只把最新狀態放進記憶體中的待寫清單，由背景執行緒每隔
+# FLUSH_INTERVAL 秒合併成一次交易寫入，rerun 路徑上不做任何磁碟 I/O。
+import os
+import threading
+import time
+
+from write_behind import WriteBehind
+
+DB_PATH = os.environ.get("QUIZ_PROGRESS_DB", "progress.db")
+FLUSH_INTERVAL = float(os.environ.get("QUIZ_PROGRESS_FLUSH_SECONDS", "2"))
+
+# 待寫入：(使用者, 題庫) → frozenset(題目索引)；同一鍵只保留最新狀態
+_PENDING = {}
+_PENDING_LOCK = threading.Lock()
+
+
+# =====================================================
+# 🔢 bitset 編碼
+# =====================================================
+def encode_bitset(indices):
+    if not indices:
+        return b""
+    bits = 0
+    for i in indices:
+        bits |= 1 << i
+    return bits.to_bytes((max(indices) // 8) + 1, "little")
+
+
+def decode_bitset(data):
+    indices = set()
+    for byte_idx, byte in enumerate(data or b""):
+        if byte:
+            indices.update(byte_idx * 8 + bit for bit in range(8) if byte >> bit & 1)
+    return indices
+
+
+# =====================================================
+# 🗄️ SQLite（write_behind 背景批次寫入）
+# =====================================================
+def _setup(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS progress (
+            user TEXT NOT NULL,
+            bank TEXT NOT NULL,
+            answered BLOB NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (user, bank)
+        )
+        """
+    )
+
+
+def _drain():
+    with _PENDING_LOCK:
+        batch = list(_PENDING.items())
+        _PENDING.clear()
+    return batch
+
+
+def _write(conn, batch):
+    now = time.time()
+    conn.executemany(
+        """
+        INSERT INTO progress (user, bank, answered, updated_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (user, bank) DO UPDATE SET answered = excluded.answered, updated_at = excluded.updated_at
+        """,
+        [(user, bank, encode_bitset(answered), now) for (user, bank), answered in batch],
+    )
+    return len(batch)
+
+
+def _requeue(batch):
+    # 寫入期間又記錄了同一鍵的新狀態時，保留較新的狀態
+    with _PENDING_LOCK:
+        for key, answered in batch:
+            _PENDING.setdefault(key, answered)
+
+
+_writer = WriteBehind("progress", DB_PATH, FLUSH_INTERVAL, _setup, _drain, _write, _requeue)
+# 把待寫入的紀錄一次寫進 SQLite；回傳寫入筆數
+flush = _writer.flush
+
+
+# =====================================================
+# 📤 對外介面
+# =====================================================
+def save_progress(user, bank, answered):
+    """ 記錄最新的作答狀態（非同步寫入） """
+    with _PENDING_LOCK:
+        _PENDING[(user, bank)] = frozenset(answered)
+    _writer.start()
+
+
+def load_progress(user, bank):
+    """ 讀取作答紀錄；尚未寫入的最新狀態優先 """
+    with _PENDING_LOCK:
+        pending = _PENDING.get((user, bank))
+    if pending is not None:
+        return set(pending)
+
+    with _writer.lock:
+        row = _writer.connect().execute(
+            "SELECT answered FROM progress WHERE user = ? AND bank = ?", (user, bank)
+        ).fetchone()
+    return decode_bitset(row[0]) if row else set()
+
@@ -0,0 +1,566 @@
+# quiz_bank.py
+# =====================================================
+# 📘 題庫載入器（全程序共用快取）
+# =====================================================
+# Streamlit 每次 rerun 都會重新執行 app.py，但被 import 的模組只會載入一次，
+# 因此把解密後的題庫放在這裡，編譯成唯讀的 QuestionBank，所有 session 共用。
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from batch_jobs import error_text
+from search_index import SearchIndex
+
+DEFAULT_BANK_NAME = "questions"
+DEFAULT_GROUP = "一般"
+OPTION_LABELS = ("A", "B", "C", "D")
+WARM_UP = "warm_up"
+BANK_EXTENSIONS = (".enc", ".json")
+# 判斷檔案是不是題庫時只讀開頭這麼多 bytes
+BANK_PEEK_BYTES = 1 << 16
+# Fernet token 以版本位元組 0x80 與時間戳記開頭，base64 後固定是這幾個字元
+FERNET_TOKEN_PREFIX = b"gAAAAA"
+
+# =====================================================
+# 📦 分段加密題庫格式（QZB1）
+# =====================================================
+# 每一題各自以 Fernet 加密，開啟題目時只解密那一題。整數皆為 little-endian：
+#   b"QZB1"                               檔頭
+#   Fernet(題目 JSON) × N                  依題號順序
+#   Fernet(meta JSON)                     {"groups": [...], "types": [...]}，首頁分組用
+#   (offset u64, length u32) × N          題目索引（明文，只有位置與長度）
+#   (index_offset u64, count u32, meta_offset u64, meta_length u32, b"QZB1")  檔尾
+# 副檔名同樣是 .enc，讀取時以檔頭判斷是哪一種格式。
+CHUNKED_MAGIC = b"QZB1"
+CHUNK_INDEX_ENTRY = struct.Struct("<QI")
+CHUNK_TRAILER = struct.Struct("<QIQI4s")
+
+# 題庫目錄與記憶體中最多保留幾份解密後的題庫（LRU）
+BANK_DIR = os.environ.get("QUIZ_BANK_DIR", ".")
+MAX_CACHED_BANKS = max(1, int(os.environ.get("QUIZ_BANK_CACHE_SIZE", "4")))
+
+# 快取：路徑 → (檔案簽章, 題庫, 載入時間, 內容雜湊, 是否已完整驗證)；檔案變動時簽章不同，自動重新載入
+# 以 OrderedDict 做 LRU，最近使用的放在最後，超過上限就從最前面淘汰
+_CACHE = OrderedDict()
+_LOCK = threading.Lock()
+# 解密可能較久，另用一把鎖避免同一時間重複解密，且不阻擋快取命中
+_LOAD_LOCK = threading.Lock()
+
+# 題庫清單快取：目錄 → (目錄 mtime, 金鑰指紋, {名稱: 路徑})
+_DISCOVERY = {}
+
+# 更新後無法載入的版本：路徑 → (檔案簽章, 錯誤訊息)；同一版本不再重試，繼續使用舊題庫
+_FAILED = {}
+
+# 統計數據：載入次數、快取命中次數、累計與最近一次載入耗時（秒）
+_STATS = {
+    "loads": 0,
+    "hits": 0,
+    "evictions": 0,
+    "reloads": 0,
+    "reload_failures": 0,
+    "load_seconds": 0.0,
+    "last_load_seconds": 0.0,
+    "last_loaded_at": None,
+}
+
+
+def key_fingerprint(key):
+    """ 金鑰指紋（只取雜湊前 12 碼，不會把金鑰本身放進快取鍵） """
+    if not key:
+        return ""
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+
+def _file_signature(path, key):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size, key_fingerprint(key))
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def is_chunked_bank(path):
+    with open(path, "rb") as f:
+        return f.read(len(CHUNKED_MAGIC)) == CHUNKED_MAGIC
+
+
+def _fernet(key):
+    # cryptography 等到真的要解密才載入：明文題庫、gen_ppt 等工具與伺服器啟動都不必付這個成本
+    from cryptography.fernet import Fernet
+
+    return Fernet(key.encode())
+
+
+def _open_chunked(path, key):
+    """ 開啟 QZB1 題庫，回傳 (檔案, 題目索引, meta, fernet)；題目以 os.pread 依位置讀取
+
+    不用 mmap：檔案被就地覆寫（cp、scp、rsync、編輯器直接存檔）變短時，
+    讀取 mmap 超出新檔尾的頁面會讓整個程序收到 SIGBUS；pread 只會讀到較短的資料，
+    解密時變成 InvalidToken，由一般的錯誤處理接手。
+    """
+    fernet = _fernet(key)
+    f = open(path, "rb")
+    try:
+        fd = f.fileno()
+        size = os.fstat(fd).st_size
+        if size < len(CHUNKED_MAGIC) + CHUNK_TRAILER.size or os.pread(fd, len(CHUNKED_MAGIC), 0) != CHUNKED_MAGIC:
+            raise ValueError(f"{path} 不是有效的分段加密題庫")
+        index_offset, count, meta_offset, meta_length, magic = CHUNK_TRAILER.unpack(
+            os.pread(fd, CHUNK_TRAILER.size, size - CHUNK_TRAILER.size)
+        )
+        if magic != CHUNKED_MAGIC:
+            raise ValueError(f"{path} 檔尾損毀")
+
+        index_bytes = os.pread(fd, count * CHUNK_INDEX_ENTRY.size, index_offset)
+        if len(index_bytes) != count * CHUNK_INDEX_ENTRY.size:
+            raise ValueError(f"{path} 題目索引不完整")
+        index = tuple(CHUNK_INDEX_ENTRY.iter_unpack(index_bytes))
+        meta = json.loads(fernet.decrypt(os.pread(fd, meta_length, meta_offset)))
+    except BaseException:
+        f.close()
+        raise
+    return f, index, meta, fernet
+
+
+def _file_version(f):
+    stat = os.fstat(f.fileno())
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def read_records(path, key=None):
+    """ 讀取題庫原始資料（list of dict），.enc 以 Fernet 解密，其餘視為明文 JSON """
+    if path.endswith(".enc"):
+        if not key:
+            raise ValueError(f"{path} 需要 QUIZ_SECRET_KEY 才能解密")
+        if is_chunked_bank(path):
+            f, index, _, fernet = _open_chunked(path, key)
+            with f:
+                return [json.loads(fernet.decrypt(os.pread(f.fileno(), length, off))) for off, length in index]
+        with open(path, "rb") as f:
+            encrypted_data = f.read()
+        decrypted = _fernet(key).decrypt(encrypted_data)
+        return json.loads(decrypted.decode())
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# =====================================================
+# 🧊 編譯後的唯讀題庫
+# =====================================================
+def question_label(index):
+    return f"題目 {index + 1}"
+
+
+def record_group(record):
+    return sys.intern(record.get("q_group") or DEFAULT_GROUP)
+
+
+def record_type(record):
+    return sys.intern(record.get("q_type") or "q")
+
+
+class Question:
+    """ 單一題目（唯讀）；選項只保留有內容的 A–D，依序存成 (標籤, 內容) """
+
+    __slots__ = ("index", "group", "q_type", "is_warm_up", "label",
+                 "question", "options", "answer", "explanation")
+
+    def __init__(self, index, record):
+        q_type = record_type(record)
+        values = {
+            "index": index,
+            "group": record_group(record),
+            "q_type": q_type,
+            "is_warm_up": q_type == WARM_UP,
+            "label": question_label(index),
+            "question": record["question"],
+            "options": tuple((opt, record[opt]) for opt in OPTION_LABELS if record.get(opt)),
+            "answer": record["answer"],
+            "explanation": record.get("explanation", ""),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Question 為唯讀物件")
+
+    def __repr__(self):
+        return f"Question({self.index}, {self.group!r})"
+
+    def to_dict(self):
+        """ 還原成原始題庫 JSON 的格式 """
+        record = {"q_group": self.group, "q_type": self.q_type, "question": self.question}
+        record.update(self.options)
+        record["answer"] = self.answer
+        record["explanation"] = self.explanation
+        return record
+
+
+class QuestionBank:
+    """ 整份題庫（唯讀），載入時一次算好分組索引，所有 session 共用
+
+    groups：((組名, (題目索引, ...)), ...)，依題目首次出現的順序
+    warm_up：暖身題的題目索引（首頁上色用，不必取出題目本身）
+    """
+
+    __slots__ = ("name", "groups", "warm_up", "_questions", "_search")
+
+    def __init__(self, name, records):
+        questions = []
+        for i, record in enumerate(records):
+            try:
+                questions.append(Question(i, record))
+            except KeyError as e:
+                raise ValueError(f"第 {i + 1} 題缺少欄位 {e}") from None
+            except AttributeError:
+                raise ValueError(f"第 {i + 1} 題格式錯誤") from None
+
+        self._init_index(name, [q.group for q in questions], [q.q_type for q in questions])
+        object.__setattr__(self, "_questions", tuple(questions))
+
+    def _init_index(self, name, groups, types):
+        grouped = {}
+        for i, group in enumerate(groups):
+            grouped.setdefault(group, []).append(i)
+
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "groups", tuple((g, tuple(idx)) for g, idx in grouped.items()))
+        object.__setattr__(self, "warm_up", frozenset(i for i, t in enumerate(types) if t == WARM_UP))
+        object.__setattr__(self, "_search", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("QuestionBank 為唯讀物件")
+
+    def __len__(self):
+        return len(self._questions)
+
+    def __getitem__(self, idx):
+        return self._questions[idx]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r}, {len(self)} 題)"
+
+    def to_records(self):
+        return [q.to_dict() for q in self]
+
+    def search_index(self):
+        """ 全文搜尋索引；預熱（serve.py 啟動、/healthz?warm=1）與題庫熱更新時會先建好，否則在第一次搜尋時建立。
+        建索引比解密、編譯題庫本身慢得多，所以不放在第一位訪客等待的 load_bank 裡 """
+        index = self._search
+        if index is None:
+            # 多個 session 同時建立也只是重複計算，結果相同
+            index = SearchIndex(self)
+            object.__setattr__(self, "_search", index)
+        return index
+
+    def search(self, query, limit=20):
+        """ 搜尋題目，回傳排序後的題目索引；輸入題號（例如 12）時該題排第一 """
+        results = self.search_index().search(query, limit)
+        query = query.strip()
+        if query.isdigit() and 1 <= int(query) <= len(self):
+            idx = int(query) - 1
+            results = [idx] + [i for i in results if i != idx][:limit - 1]
+        return results
+
+
+class ChunkedQuestionBank(QuestionBank):
+    """ QZB1 分段加密題庫：檔案保持開啟，只有被開啟過的題目才會讀取、解密並留在記憶體 """
+
+    __slots__ = ("_file", "_version", "_index", "_fernet")
+
+    def __init__(self, name, path, key):
+        f, index, meta, fernet = _open_chunked(path, key)
+        if len(meta["groups"]) != len(index) or len(meta["types"]) != len(index):
+            f.close()
+            raise ValueError(f"{path} 索引與題目數量不一致")
+
+        self._init_index(name, [sys.intern(g) for g in meta["groups"]], meta["types"])
+        object.__setattr__(self, "_file", f)
+        object.__setattr__(self, "_version", _file_version(f))
+        object.__setattr__(self, "_index", index)
+        object.__setattr__(self, "_fernet", fernet)
+        # 已解密的題目；多個 session 同時解密同一題也只是重複計算，結果相同
+        object.__setattr__(self, "_questions", [None] * len(index))
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self._index)
+        q = self._questions[idx]
+        if q is None:
+            if not self.file_unchanged():
+                raise ValueError(f"題庫 {self.name} 的檔案已被覆寫，第 {idx + 1} 題要等新版本載入後才能讀取")
+            offset, length = self._index[idx]
+            record = json.loads(self._fernet.decrypt(os.pread(self._file.fileno(), length, offset)))
+            q = Question(idx, record)
+            self._questions[idx] = q
+        return q
+
+    def file_unchanged(self):
+        """ 開啟後檔案是否仍是同一份（沒有被就地覆寫）；被換名取代時舊檔案仍可讀，不受影響 """
+        return _file_version(self._file) == self._version
+
+    def loaded_count(self):
+        return sum(q is not None for q in self._questions)
+
+
+def can_serve(bank):
+    """ 題庫是否還能讀取每一題：分段加密題庫的檔案被就地覆寫後，只有全部題目都已解密才能繼續使用 """
+    if isinstance(bank, ChunkedQuestionBank):
+        return bank.loaded_count() == len(bank) or bank.file_unchanged()
+    return True
+
+
+def bank_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def compile_bank(path, key=None):
+    """ 讀取並編譯題庫；QZB1 格式只讀索引，題目留待開啟時再解密 """
+    if path.endswith(".enc") and key and is_chunked_bank(path):
+        return ChunkedQuestionBank(bank_name(path), path, key)
+    return QuestionBank(bank_name(path), read_records(path, key))
+
+
+def _cache_get(abs_path, signature, validate=False):
+    with _LOCK:
+        cached = _CACHE.get(abs_path)
+        if cached is None or cached[0] != signature or (validate and not cached[4]):
+            return None
+        _CACHE.move_to_end(abs_path)
+        _STATS["hits"] += 1
+        return cached[1]
+
+
+def _cache_put(abs_path, signature, bank, loaded_at, digest, validated):
+    with _LOCK:
+        _CACHE[abs_path] = (signature, bank, loaded_at, digest, validated)
+        _CACHE.move_to_end(abs_path)
+        while len(_CACHE) > MAX_CACHED_BANKS:
+            _CACHE.popitem(last=False)
+            _STATS["evictions"] += 1
+
+
+def validate_bank(bank):
+    """ 分段加密題庫平常只解密開啟的題目；熱更新時先全部解密一次，確認每一題都讀得到 """
+    if isinstance(bank, ChunkedQuestionBank):
+        for i in range(len(bank)):
+            bank[i]
+
+
+def load_bank(path, key=None, validate=False):
+    """ 取得編譯後的 QuestionBank；同一檔案（路徑 + mtime + 大小 + 金鑰指紋）只會解密一次
+
+    檔案更新後：內容雜湊相同就沿用原本的題庫（不重新解密）；
+    取代舊版本的新版本一律先完整驗證（不論是 rerun 還是 bank_watcher 先讀到），
+    解密或驗證失敗時繼續使用舊題庫，不讓頁面出錯。
+    validate=True 時，快取中尚未驗證過的題庫也會先驗證才回傳。
+    """
+    abs_path = os.path.abspath(path)
+    signature = _file_signature(abs_path, key)
+
+    bank = _cache_get(abs_path, signature, validate)
+    if bank is not None:
+        return bank
+
+    with _LOAD_LOCK:
+        # 等待鎖的期間可能已由其他 session 載入（並驗證）完成
+        bank = _cache_get(abs_path, signature, validate)
+        if bank is not None:
+            return bank
+
+        with _LOCK:
+            previous = _CACHE.get(abs_path)
+        if previous is not None and previous[0] == signature:
+            # 同一版本第一次載入時沒有驗證（沒有舊版本可退回），現在補做
+            try:
+                validate_bank(previous[1])
+            except Exception as e:
+                _FAILED[abs_path] = (signature, error_text(e))
+                _STATS["reload_failures"] += 1
+                raise
+            _cache_put(abs_path, signature, previous[1], previous[2], previous[3], True)
+            return previous[1]
+        # 舊版本只有在金鑰相同、且仍能讀取每一題時才能代替新版本
+        # （分段加密題庫的檔案被就地覆寫後，尚未解密的題目已讀不到）
+        if previous is not None and (previous[0][2] != signature[2] or not can_serve(previous[1])):
+            previous = None
+        failed = _FAILED.get(abs_path)
+        if previous is not None and failed is not None and failed[0] == signature:
+            return previous[1]
+
+        digest = file_digest(abs_path)
+        if previous is not None and previous[3] == digest:
+            # 只有 mtime 變了（touch、重新複製相同檔案），內容沒變
+            _cache_put(abs_path, signature, previous[1], previous[2], digest, previous[4])
+            return previous[1]
+
+        validated = validate or previous is not None
+        started = time.perf_counter()
+        try:
+            bank = compile_bank(abs_path, key)
+            if validated:
+                validate_bank(bank)
+        except Exception as e:
+            if previous is None:
+                raise
+            _FAILED[abs_path] = (signature, error_text(e))
+            _STATS["reload_failures"] += 1
+            print(f"⚠️ 題庫 {os.path.basename(abs_path)} 更新後無法載入，繼續使用舊版本：{error_text(e)}")
+            return previous[1]
+        elapsed = time.perf_counter() - started
+        loaded_at = time.time()
+
+        _FAILED.pop(abs_path, None)
+        _cache_put(abs_path, signature, bank, loaded_at, digest, validated)
+
+        _STATS["loads"] += 1
+        _STATS["reloads"] += previous is not None
+        _STATS["load_seconds"] += elapsed
+        _STATS["last_load_seconds"] = elapsed
+        _STATS["last_loaded_at"] = loaded_at
+        return bank
+
+
+def build_search_index(bank):
+    """ 預先建立搜尋索引（一般題庫）；分段加密題庫需解密全部題目，留到第一次搜尋 """
+    if not isinstance(bank, ChunkedQuestionBank):
+        bank.search_index()
+    return bank
+
+
+def reload_bank(path, key=None):
+    """ 檔案變動時由 bank_watcher 呼叫：立即重新載入並完整驗證，成功才換掉快取中的題庫 """
+    return build_search_index(load_bank(path, key, validate=True))
+
+
+def cached_bank(path):
+    """ 快取中的題庫（不檢查檔案是否變動、不計入命中）；不在快取中回傳 None """
+    with _LOCK:
+        cached = _CACHE.get(os.path.abspath(path))
+    return cached[1] if cached is not None else None
+
+
+def bank_digest(bank):
+    """ 快取中這個題庫物件的內容雜湊；題庫已被淘汰或換成新版本時回傳 None """
+    with _LOCK:
+        for _, cached, _, digest, _ in _CACHE.values():
+            if cached is bank:
+                return digest
+    return None
+
+
+def reload_errors():
+    """ 更新後無法載入的題庫：{路徑: 錯誤訊息} """
+    return {path: error for path, (_, error) in _FAILED.items()}
+
+
+def looks_like_bank(path):
+    """ 只看檔案開頭判斷是不是題庫（不解密、不解析整份 JSON）
+
+    .enc：QZB1 檔頭或 Fernet token；.json：陣列，且第一題有 question 欄位。
+    題庫目錄預設是專案根目錄，bench_app 的 --output、keep_alive 的 targets.json /
+    --stats-file 等 JSON 檔也可能放在這裡，不能被當成題庫列出。
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(BANK_PEEK_BYTES)
+    except OSError:
+        return False
+    if path.endswith(".enc"):
+        return head.startswith((CHUNKED_MAGIC, FERNET_TOKEN_PREFIX))
+
+    text = head.decode("utf-8", errors="ignore").lstrip("\ufeff \t\r\n")
+    if not text.startswith("["):
+        return False
+    try:
+        first, _ = json.JSONDecoder().raw_decode(text[1:].lstrip())
+    except json.JSONDecodeError:
+        # 第一題比讀到的開頭還長時無法完整解析，改看開頭是否出現 question 欄位
+        return len(head) == BANK_PEEK_BYTES and '"question"' in text
+    return isinstance(first, dict) and "question" in first
+
+
+def discover_banks(directory=None, key=None):
+    """ 掃描題庫目錄，回傳 {名稱: 路徑}；只列出檔案，不會解密
+
+    同名的 .enc 與 .json 並存時，有金鑰就用 .enc，否則用 .json；
+    沒有金鑰時 .enc 題庫無法解密，因此不列出；開頭看起來不是題庫的檔案也不列出。
+    """
+    directory = directory or BANK_DIR
+    mtime = os.stat(directory).st_mtime_ns
+    fingerprint = key_fingerprint(key)
+    cached = _DISCOVERY.get(directory)
+    if cached is not None and cached[0] == mtime and cached[1] == fingerprint:
+        return cached[2]
+
+    banks = {}
+    for filename in sorted(os.listdir(directory)):
+        name, ext = os.path.splitext(filename)
+        if ext not in BANK_EXTENSIONS or filename.startswith("."):
+            continue
+        if ext == ".enc" and not key:
+            continue
+        if name in banks and ext != ".enc":
+            continue
+        path = os.path.join(directory, filename)
+        if looks_like_bank(path):
+            banks[name] = path
+
+    _DISCOVERY[directory] = (mtime, fingerprint, banks)
+    return banks
+
+
+def default_bank_name(banks):
+    """ 預設題庫：優先使用 questions（.enc / .json），否則取清單中的第一個 """
+    if DEFAULT_BANK_NAME in banks:
+        return DEFAULT_BANK_NAME
+    return next(iter(banks), None)
+
+
+def warm_default_bank(key=None, directory=None):
+    """ 預先載入預設題庫並建立搜尋索引（伺服器啟動或健康檢查時呼叫）；回傳題庫名稱 """
+    banks = discover_banks(directory, key)
+    name = default_bank_name(banks)
+    if name is not None:
+        build_search_index(load_bank(banks[name], key))
+    return name
+
+
+def cached_banks():
+    """ 目前在記憶體中的題庫：[{name, path, questions, age_seconds}]，最近使用的在最後 """
+    now = time.time()
+    with _LOCK:
+        entries = list(_CACHE.items())
+    return [
+        {"name": bank.name, "path": path, "questions": len(bank), "age_seconds": round(now - loaded_at, 3)}
+        for path, (_, bank, loaded_at, _, _) in entries
+    ]
+
+
+def bank_stats():
+    """ 回傳目前的載入 / 快取命中統計（複本） """
+    stats = dict(_STATS)
+    stats["cached_banks"] = len(_CACHE)
+    return stats
+
+
+def clear_cache():
+    with _LOCK:
+        _CACHE.clear()
+        _FAILED.clear()
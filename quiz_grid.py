@@ -0,0 +1,46 @@
+# quiz_grid.py
+# =====================================================
+# 🟩 題目方格元件
+# =====================================================
+# 整個首頁方格是一個自訂元件：Python 端只送出精簡的分組索引與作答狀態，
+# 方塊由瀏覽器端產生並分頁，點擊後回傳題目索引。
+import os
+
+import streamlit as st
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz_grid_frontend")
+PAGE_SIZE = int(os.environ.get("QUIZ_GRID_PAGE_SIZE", "40"))
+
+_component = None
+
+
+def get_component():
+    """ 第一次用到時才載入 streamlit.components.v1 並宣告元件。
+    宣告必須在 script 執行中才會註冊到 runtime，所以 serve.py 啟動時只預先 import 模組 """
+    global _component
+    if _component is None:
+        import streamlit.components.v1 as components
+
+        _component = components.declare_component("quiz_grid", path=FRONTEND_DIR)
+    return _component
+
+
+def quiz_grid(bank, answered, key):
+    """ 顯示題目方格；有新的點擊時回傳題目索引，否則回傳 None """
+    value = get_component()(
+        groups=bank.groups,
+        warm_up=sorted(bank.warm_up),
+        answered=sorted(answered),
+        page_size=PAGE_SIZE,
+        key=key,
+        default=None,
+    )
+    if not value:
+        return None
+
+    # 元件的值在之後的 rerun 中會一直保留，用 nonce 確認是新的點擊
+    nonce_key = f"{key}_nonce"
+    if st.session_state.get(nonce_key) == value["nonce"]:
+        return None
+    st.session_state[nonce_key] = value["nonce"]
+    return value["index"]
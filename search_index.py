@@ -0,0 +1,112 @@
+# search_index.py
+# =====================================================
+# 🔎 題庫全文搜尋（字元 n-gram 倒排索引）
+# =====================================================
+# 中文不必斷詞：把題目、選項、答案、解釋正規化後切成單字與雙字（bigram），
+# 建立「字串 → 出現的題目」倒排索引。查詢時只看查詢字串對應的幾條索引，
+# 不會逐題掃描；命中欄位越重要（題目 > 選項 / 答案 > 解釋）排名越前面。
+# 每筆索引項目以一個整數存放：題目索引 << 4 | 欄位位元，放進 array 節省記憶體。
+import heapq
+import unicodedata
+from array import array
+
+# 欄位位元與權重
+FIELD_QUESTION, FIELD_OPTIONS, FIELD_ANSWER, FIELD_EXPLANATION = 1, 2, 4, 8
+FIELD_WEIGHTS = {FIELD_QUESTION: 4, FIELD_OPTIONS: 2, FIELD_ANSWER: 2, FIELD_EXPLANATION: 1}
+# 欄位位元組合 → 權重總和（查表，避免查詢時逐位元計算）
+_MASK_WEIGHT = tuple(
+    sum(w for bit, w in FIELD_WEIGHTS.items() if mask & bit) for mask in range(16)
+)
+DEFAULT_LIMIT = 20
+
+
+def normalize(text):
+    """ 全形轉半形、英文轉小寫，並以非文字字元（標點、空白）切段 """
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    runs, current = [], []
+    for ch in text:
+        if ch.isalnum():
+            current.append(ch)
+        elif current:
+            runs.append("".join(current))
+            current = []
+    if current:
+        runs.append("".join(current))
+    return runs
+
+
+def grams(text):
+    """ 單字 + 相鄰雙字；不跨越標點 """
+    result = set()
+    for run in normalize(text):
+        result.update(run)
+        result.update(run[i:i + 2] for i in range(len(run) - 1))
+    return result
+
+
+def query_grams(query):
+    """ 查詢用：有雙字時只用雙字（較精確），只有單一字元時才用單字 """
+    runs = normalize(query)
+    bigrams = {run[i:i + 2] for run in runs for i in range(len(run) - 1)}
+    return bigrams or set("".join(runs))
+
+
+class SearchIndex:
+    __slots__ = ("_postings", "size")
+
+    def __init__(self, questions):
+        postings = {}
+        size = 0
+        for q in questions:
+            fields = {}
+            for bit, text in (
+                (FIELD_QUESTION, q.question),
+                (FIELD_OPTIONS, " ".join(text for _, text in q.options)),
+                (FIELD_ANSWER, q.answer),
+                (FIELD_EXPLANATION, q.explanation),
+            ):
+                for gram in grams(text):
+                    fields[gram] = fields.get(gram, 0) | bit
+            for gram, mask in fields.items():
+                entries = postings.get(gram)
+                if entries is None:
+                    entries = postings[gram] = array("I")
+                entries.append(q.index << 4 | mask)
+            size += 1
+        self._postings = postings
+        self.size = size
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """ 回傳排序後的題目索引；所有字串都命中的題目優先，其次依命中數與欄位權重 """
+        wanted = query_grams(query)
+        if not wanted:
+            return []
+        lists = [entries for entries in (self._postings.get(g) for g in wanted) if entries]
+        if not lists:
+            return []
+
+        # 題目索引 → [命中字串數, 權重總和]
+        scores = {}
+        for entries in lists:
+            for value in entries:
+                idx = value >> 4
+                score = scores.get(idx)
+                if score is None:
+                    scores[idx] = [1, _MASK_WEIGHT[value & 15]]
+                else:
+                    score[0] += 1
+                    score[1] += _MASK_WEIGHT[value & 15]
+
+        # 至少要命中一半的字串，避免只共用一個常見字的題目擠進結果
+        threshold = max(1, (len(wanted) + 1) // 2)
+        return heapq.nsmallest(
+            limit,
+            (idx for idx, (hits, _) in scores.items() if hits >= threshold),
+            key=lambda idx: (-scores[idx][0], -scores[idx][1], idx),
+        )
+
+    def __len__(self):
+        return self.size
+
+    def gram_count(self):
+        return len(self._postings)
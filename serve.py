@@ -0,0 +1,180 @@
+# serve.py
+# =====================================================
+# 🚀 啟動 Streamlit，並在同一個 port 提供 /healthz
+# =====================================================
+# `streamlit run app.py` 的 /?ping=1 必須建立 websocket session、跑完整個 app.py
+# 才會回應；單純的 HTTP GET 根本不會執行 app.py。這裡在 Streamlit 的 tornado
+# 伺服器上多掛一個 /healthz，直接回傳 JSON，不經過 Streamlit script：
+#   GET /healthz          → {"status": "ok", "streamlit_ready": true, "bank_loaded": true, ...}
+#   GET /healthz?warm=1   → 先載入預設題庫再回應（喚醒後預熱用）
+#   GET /assets/app.css   → 全局樣式（static/），帶 ?v= 時瀏覽器長期快取
+#   GET /metrics          → Prometheus 文字格式的效能指標（QUIZ_METRICS=1 才開啟；
+#                           有設 QUIZ_METRICS_TOKEN 時需帶 Authorization: Bearer <token> 或 ?token=）
+# 伺服器一啟動就在背景預熱：import app.py 用到的模組、解密預設題庫，
+# 容器喚醒後第一位訪客的 rerun 不必再等這些（QUIZ_PREWARM=0 可關閉）。
+# 用法：python serve.py [app.py]（Docker 映像預設以此啟動）
+import startup  # 最先載入：從這裡開始計算啟動耗時
+
+import hmac
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+
+import tornado.web
+from tornado.ioloop import IOLoop
+from dotenv import load_dotenv
+from streamlit import config
+from streamlit.runtime.runtime import RuntimeState
+from streamlit.web import bootstrap
+from streamlit.web.server import server as st_server
+from streamlit.web.server.server_util import make_url_path_regex
+
+import metrics
+import quiz_bank
+import styles
+
+startup.mark("imports")
+
+HEALTH_ENDPOINT = "healthz"
+METRICS_ENDPOINT = "metrics"
+STARTED_AT = time.time()
+_READY_STATES = (RuntimeState.NO_SESSIONS_CONNECTED, RuntimeState.ONE_OR_MORE_SESSIONS_CONNECTED)
+
+PREWARM = os.environ.get("QUIZ_PREWARM", "1") != "0"
+# app.py 會用到、但 serve.py 本身沒有 import 的模組
+PREWARM_MODULES = (
+    "streamlit.components.v1", "quiz_grid", "progress_store", "live_session",
+)
+
+
+def health_status(runtime=None):
+    """ 健康檢查內容：只看記憶體中的狀態，不解密、不讀題庫
+
+    /healthz 不需驗證，所以不回傳檔案路徑與錯誤訊息：題庫只列名稱、題數與載入多久，
+    更新失敗只給數量；詳細內容在管理頁（效能指標）查看
+    """
+    key = os.environ.get("QUIZ_SECRET_KEY")
+    banks = quiz_bank.discover_banks(key=key)
+    default_name = quiz_bank.default_bank_name(banks)
+    cached = quiz_bank.cached_banks()
+    default_entry = next((b for b in cached if b["name"] == default_name), None)
+    return {
+        "status": "ok",
+        "uptime_seconds": round(time.time() - STARTED_AT, 3),
+        "streamlit_ready": runtime is not None and runtime.state in _READY_STATES,
+        "default_bank": default_name,
+        "bank_loaded": default_entry is not None,
+        "bank_age_seconds": default_entry["age_seconds"] if default_entry else None,
+        "cached_banks": [
+            {"name": b["name"], "questions": b["questions"], "age_seconds": b["age_seconds"]} for b in cached
+        ],
+        "bank_stats": quiz_bank.bank_stats(),
+        # 題庫檔案更新後無法載入（仍在使用舊版本）的題庫數
+        "reload_errors": len(quiz_bank.reload_errors()),
+        "startup": startup.report(),
+    }
+
+
+def prewarm():
+    """ 背景預熱：import app 模組、開始監看題庫目錄、解密預設題庫。
+    第一位訪客若在預熱完成前進來，load_bank 會等待同一次解密，不會重複解密 """
+    key = os.environ.get("QUIZ_SECRET_KEY")
+    try:
+        for name in PREWARM_MODULES:
+            importlib.import_module(name)
+        import bank_watcher
+
+        bank_watcher.start(key=key)
+        startup.mark("app_modules")
+        if quiz_bank.warm_default_bank(key) is not None:
+            startup.mark("bank_prewarmed")
+    except Exception as e:
+        print(f"⚠️ 預熱失敗（第一位訪客載入時會再試一次）：{e}", flush=True)
+    print(startup.summary(), flush=True)
+
+
+class HealthzHandler(tornado.web.RequestHandler):
+    def initialize(self, runtime):
+        self._runtime = runtime
+
+    async def get(self):
+        if self.get_argument("warm", "") == "1":
+            try:
+                # 解密與建立搜尋索引在 thread pool 中執行（冷啟動時還可能在等預熱執行緒），
+                # 不佔住 tornado 的 IOLoop：其他請求與 websocket session 照常運作
+                await IOLoop.current().run_in_executor(
+                    None, quiz_bank.warm_default_bank, os.environ.get("QUIZ_SECRET_KEY")
+                )
+            except Exception as e:
+                # 錯誤訊息可能含檔案路徑，只寫進伺服器 log
+                print(f"⚠️ /healthz?warm=1 載入題庫失敗：{e}", flush=True)
+                self.set_status(503)
+                self.finish({"status": "error"})
+                return
+        self.set_header("Content-Type", "application/json")
+        self.set_header("Cache-Control", "no-store")
+        self.finish(json.dumps(health_status(self._runtime), ensure_ascii=False))
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        if not metrics.ENABLED:
+            raise tornado.web.HTTPError(404)
+        token = os.environ.get("QUIZ_METRICS_TOKEN")
+        if token:
+            given = self.get_argument("token", "") or self.request.headers.get("Authorization", "").removeprefix("Bearer ")
+            # 以 bytes 比較：str 版本遇到非 ASCII 字元會丟 TypeError（變成 500）
+            if not hmac.compare_digest(given.encode(), token.encode()):
+                raise tornado.web.HTTPError(403)
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.set_header("Cache-Control", "no-store")
+        self.finish(metrics.prometheus_text())
+
+
+_original_create_app = st_server.Server._create_app
+
+
+def _create_app_with_healthz(self):
+    app = _original_create_app(self)
+    base = config.get_option("server.baseUrlPath")
+    app.add_handlers(r".*", [
+        (make_url_path_regex(base, HEALTH_ENDPOINT), HealthzHandler, {"runtime": self._runtime}),
+        (make_url_path_regex(base, METRICS_ENDPOINT), MetricsHandler),
+        (make_url_path_regex(base, styles.STATIC_ROUTE, r"(.*)", trailing_slash=False),
+         tornado.web.StaticFileHandler, {"path": styles.STATIC_DIR}),
+    ])
+    styles.static_served = True
+    return app
+
+
+_original_start = st_server.Server.start
+
+
+async def _start_then_prewarm(self):
+    # 伺服器開始接受連線之後才預熱，不和啟動搶 CPU（/healthz 與第一個請求不會因此變慢）
+    await _original_start(self)
+    startup.mark("server")
+    if PREWARM:
+        threading.Thread(target=prewarm, name="prewarm", daemon=True).start()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    main_script = argv[0] if argv else "app.py"
+    load_dotenv()
+
+    st_server.Server._create_app = _create_app_with_healthz
+    st_server.Server.start = _start_then_prewarm
+    flag_options = {
+        "server_port": int(os.environ.get("PORT", "8501")),
+        "server_address": os.environ.get("HOST", "0.0.0.0"),
+    }
+    bootstrap.load_config_options(flag_options)
+    bootstrap.run(main_script, False, argv[1:], flag_options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# startup.py
+# =====================================================
+# ⏱️ 冷啟動耗時紀錄
+# =====================================================
+# Render 的容器閒置後會休眠，第一位訪客要等整個程序重新啟動。
+# serve.py 最先 import 本模組，之後各階段（匯入套件、伺服器就緒、預熱 app 模組與題庫、第一個頁面）
+# 完成時記下距離啟動的秒數，啟動日誌與 /healthz 的 startup 欄位都會顯示，方便比較每次調整的效果。
+import os
+import threading
+import time
+
+STARTED = time.perf_counter()
+_MARKS = {}
+_LOCK = threading.Lock()
+
+
+def _interpreter_seconds():
+    """ 程序建立到 import 本模組經過的秒數（Python 直譯器本身的啟動）；只在 Linux 上可取得 """
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # 第 2 欄（程式名稱）可能含空白，從最後一個 ")" 之後開始數；starttime 為第 22 欄
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+
+
+_INTERPRETER = _interpreter_seconds()
+if _INTERPRETER is not None:
+    _MARKS["interpreter"] = round(_INTERPRETER, 3)
+
+
+def mark(name):
+    """ 記錄階段完成時間（秒，從本模組載入起算；同一階段只記第一次），回傳是否為第一次 """
+    with _LOCK:
+        if name in _MARKS:
+            return False
+        _MARKS[name] = round(time.perf_counter() - STARTED, 3)
+        return True
+
+
+def report():
+    with _LOCK:
+        return dict(_MARKS)
+
+
+def summary():
+    return "⏱️ 啟動耗時（秒）：" + "、".join(f"{name} {seconds:.2f}" for name, seconds in report().items())
+
+
+def first_page():
+    """ app.py 每次跑完呼叫；只有第一個頁面會記錄並印出啟動耗時 """
+    if mark("first_page"):
+        print(summary(), flush=True)
@@ -0,0 +1,75 @@
+# styles.py
+# =====================================================
+# 🎨 預先產生的樣式片段
+# =====================================================
+# 全局樣式放在 static/app.css：透過 serve.py 啟動時以 /assets/app.css?v=<雜湊> 提供，
+# 每次 rerun 只送一行 @import，瀏覽器快取檔案；直接 `streamlit run` 時改為內嵌（已壓縮）。
+# 題目頁的文字縮放樣式依拉桿的每一格（1.0 ~ 2.5，間隔 0.1）在載入時就全部產生好，
+# rerun 時只是查快取，同一倍率送出的內容完全相同，瀏覽器不必重新計算版面。
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_ROUTE = "assets"
+GLOBAL_CSS_FILE = "app.css"
+
+# 題目頁文字縮放（基礎大小 1.1rem，取自全局樣式）
+BASE_REM = 1.1
+SCALE_MIN, SCALE_MAX, SCALE_STEP = 1.0, 2.5, 0.1
+
+# serve.py 掛上 /assets 路由後設為 True
+static_served = False
+
+
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};:,>])\s*", r"\1", css).replace(";}", "}").strip()
+
+
+def _read_global_css():
+    with open(os.path.join(STATIC_DIR, GLOBAL_CSS_FILE), "r", encoding="utf-8") as f:
+        return minify_css(f.read())
+
+
+GLOBAL_CSS = _read_global_css()
+GLOBAL_CSS_VERSION = hashlib.sha256(GLOBAL_CSS.encode()).hexdigest()[:10]
+_GLOBAL_INLINE = f"<style>{GLOBAL_CSS}</style>"
+# 相對網址：設定 server.baseUrlPath 時也會指到同一個前綴底下
+_GLOBAL_LINKED = f'<style>@import url("{STATIC_ROUTE}/{GLOBAL_CSS_FILE}?v={GLOBAL_CSS_VERSION}");</style>'
+
+
+def global_style():
+    return _GLOBAL_LINKED if static_served else _GLOBAL_INLINE
+
+
+def _build_scale_style(scale):
+    font_size = BASE_REM * scale
+    button_size = BASE_REM * scale * 0.9  # 按鈕稍微小一點
+    return "<style>" + minify_css(f"""
+    h1, h2, h3, h4, h5, p, span, div, li {{
+        font-size: {font_size:.2f}rem !important;
+        line-height: 1.5em !important;
+    }}
+    button, [data-testid="stButton"] button {{
+        font-size: {button_size:.2f}rem !important;
+        padding: 0.4em 1em !important;
+    }}
+    .stAlert {{ font-size: {button_size:.2f}rem !important; }}
+    """) + "</style>"
+
+
+@lru_cache(maxsize=64)
+def _scale_style(scale):
+    return _build_scale_style(scale)
+
+
+def scale_style(scale):
+    return _scale_style(round(min(max(scale, SCALE_MIN), SCALE_MAX), 2))
+
+
+# 載入時先產生拉桿的每一格（預設倍率 1.25 不在格點上，第一次用到時才產生）
+for _i in range(round((SCALE_MAX - SCALE_MIN) / SCALE_STEP) + 1):
+    scale_style(SCALE_MIN + _i * SCALE_STEP)
@@ -0,0 +1,94 @@
+# write_behind.py
+# =====================================================
+# 🕒 SQLite 批次延遲寫入（progress_store、analytics 共用）
+# =====================================================
+# rerun 路徑上只把資料放進記憶體中的待寫區，由背景執行緒每隔 interval 秒取出一批，
+# 在同一個交易中寫入 SQLite；程序結束時再寫一次。
+# 寫入失敗（目錄被移除、磁碟已滿、資料庫被鎖住…）時：關閉連線下次重新開啟，
+# 這批資料交回 requeue 放回待寫區，下一輪再試，不會遺失；背景執行緒不會因任何例外結束。
+import atexit
+import sqlite3
+import threading
+import time
+
+
+class WriteBehind:
+    """ 一個 SQLite 資料庫的背景批次寫入器
+
+    setup(conn)          第一次連線時建立資料表 / 索引
+    drain()              取出目前待寫的一批資料（沒有資料時回傳空值）
+    write(conn, batch)   把這批資料寫進資料庫（不必 commit），回傳寫入筆數
+    requeue(batch)       寫入失敗時把這批資料放回待寫區
+    """
+
+    def __init__(self, name, db_path, interval, setup, drain, write, requeue):
+        self.name = name
+        self.db_path = db_path
+        self.interval = interval
+        # 讀取資料庫時也要拿這把鎖：待寫資料已取出、但還沒寫完時不會讀到舊資料
+        self.lock = threading.Lock()
+        self._setup = setup
+        self._drain = drain
+        self._write = write
+        self._requeue = requeue
+        self._conn = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        atexit.register(self._flush_at_exit)
+
+    def connect(self):
+        """ 共用連線（呼叫端需持有 self.lock） """
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._setup(conn)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _reset(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
+
+    def flush(self):
+        """ 立刻寫入目前待寫的資料；回傳寫入筆數。失敗時資料放回待寫區並拋出例外 """
+        with self.lock:
+            batch = self._drain()
+            if not batch:
+                return 0
+            try:
+                conn = self.connect()
+                count = self._write(conn, batch)
+                conn.commit()
+            except BaseException:
+                self._reset()
+                self._requeue(batch)
+                raise
+        return count
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                # 不論什麼錯誤都繼續執行：資料已放回待寫區，下一輪再試
+                print(f"⚠️ {self.name} 寫入失敗，稍後重試：{e}")
+
+    def start(self):
+        """ 第一次有資料要寫時啟動背景執行緒（整個程序只會啟動一次） """
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name=f"{self.name}-flusher", daemon=True)
+                    self._thread.start()
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ {self.name} 結束前寫入失敗，尚未寫入的資料已遺失：{e}")